@@ -0,0 +1,69 @@
+"""Compare the legacy literal_eval decode against the JSON decode paths.
+
+Usage: python -m benchmarks.bench_decode [--sizes 10 1000 100000] [--repeat 3]
+"""
+
+import argparse
+import ast
+import json
+import time
+import tracemalloc
+
+from benchmarks.synthetic import make_services
+from src import twofas
+
+
+def make_plain_text(count: int) -> bytes:
+    return json.dumps(make_services(count)).encode()
+
+
+def literal_eval_decode(plain_text: bytes):
+    return ast.literal_eval(plain_text.decode("utf-8").replace("\\", ""))
+
+
+def json_decode(plain_text: bytes):
+    return json.loads(plain_text)
+
+
+def measure(func, plain_text: bytes, repeat: int) -> dict:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(plain_text)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func(plain_text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": best, "peak_bytes": peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    decoders = {"literal_eval": literal_eval_decode, "json": json_decode}
+    if twofas.orjson is not None:
+        decoders["orjson"] = twofas.orjson.loads
+
+    results = []
+    for size in args.sizes:
+        plain_text = make_plain_text(size)
+        for name, func in decoders.items():
+            result = {
+                "decoder": name,
+                "services": size,
+                **measure(func, plain_text, args.repeat),
+            }
+            results.append(result)
+            print(
+                f"{name:>12} | {size:>7} services | {result['seconds'] * 1000:10.2f} ms"
+                f" | peak {result['peak_bytes'] / 1024 / 1024:8.2f} MiB"
+            )
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare the KDF backends and pick the fastest one producing identical keys.
+
+Usage: python -m benchmarks.bench_kdf [--keys 200] [--iterations 10000] [-o results.json]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from src.crypto import ITERATIONS, KDF_BACKENDS, derive_key
+
+PASSWORD = b"benchmark"
+SALT_LENGTH = 32
+# PBKDF2-HMAC-SHA256("password", "salt", 4096 iterations)
+REFERENCE = (
+    b"password",
+    b"salt",
+    4096,
+    "c5e478d59288c841aa530db6845c4c8d962893a001ce4e11a4963873aa98134a",
+)
+
+
+def derive_all(backend: str, salts: list, iterations: int) -> list:
+    return [
+        derive_key(PASSWORD, salt, None, None, iterations, backend) for salt in salts
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=ITERATIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", type=str, default=None)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    salts = [rng.randbytes(SALT_LENGTH) for _ in range(args.keys)]
+    password, salt, iterations, expected = REFERENCE
+
+    backends, keys = [], {}
+    for backend in KDF_BACKENDS:
+        # Warm up, e.g. import 'cryptography', before timing
+        correct = (
+            derive_key(password, salt, None, None, iterations, backend).hex()
+            == expected
+        )
+        start = time.perf_counter()
+        keys[backend] = derive_all(backend, salts, args.iterations)
+        seconds = time.perf_counter() - start
+        backends.append(
+            {
+                "backend": backend,
+                "correct": correct,
+                "seconds": seconds,
+                "ms_per_key": 1000 * seconds / args.keys,
+                "keys_per_second": args.keys / seconds,
+            }
+        )
+
+    identical = len({tuple(derived) for derived in keys.values()}) == 1
+    candidates = [b for b in backends if b["correct"] and identical]
+    result = {
+        "keys": args.keys,
+        "iterations": args.iterations,
+        "identical": identical,
+        "fastest": (
+            min(candidates, key=lambda b: b["seconds"])["backend"]
+            if candidates
+            else None
+        ),
+        "backends": backends,
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if result["fastest"] is None:
+        sys.exit(1)
+    return result
+
+
+if __name__ == "__main__":
+    main()
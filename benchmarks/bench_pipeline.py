@@ -0,0 +1,116 @@
+"""Time each stage of convert_2fas_to_raivo on synthetic vaults.
+
+Usage: python -m benchmarks.bench_pipeline [--sizes 10 1000 10000] [-o results.json]
+"""
+
+import argparse
+import base64
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import write_vault
+from src.archive import COMPRESSION_LEVEL, EncryptedZipWriter
+from src.crypto import aes_gcm, clear_key_cache, derive_key
+from src.helpers import convert_2fas_to_raivo
+from src.raivo import RAIVO_EXPORT_NAME, RaivoEntry
+from src.twofas import AUTH_TAG_LENGTH, decode_services
+
+PASSWORD = "benchmark"
+
+
+def timed(func, repeat: int) -> tuple:
+    """Run 'func' 'repeat' times, returning its last result and all timings"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return result, timings
+
+
+def bench_size(count: int, repeat: int, work_dir: Path) -> list:
+    src_file = write_vault(work_dir.joinpath(f"vault_{count}.2fas"), count, PASSWORD)
+    password = PASSWORD.encode()
+    stages = {}
+
+    def read():
+        with open(src_file, "r") as f:
+            return json.load(f)
+
+    data, stages["read"] = timed(read, repeat)
+    cipher_text_with_auth_tag, salt, iv = [
+        base64.b64decode(x) for x in data["servicesEncrypted"].split(":")
+    ]
+    cipher_text = cipher_text_with_auth_tag[:-AUTH_TAG_LENGTH]
+    auth_tag = cipher_text_with_auth_tag[-AUTH_TAG_LENGTH:]
+
+    key, stages["kdf"] = timed(lambda: derive_key(password, salt, cache=None), repeat)
+    (plain_text, _), stages["aes_gcm"] = timed(
+        lambda: aes_gcm(cipher_text, key, iv, encrypt=False, auth_tag=auth_tag), repeat
+    )
+    services, stages["parse"] = timed(lambda: decode_services(plain_text), repeat)
+    entries, stages["map"] = timed(
+        lambda: [e.asdict() for e in RaivoEntry.from_twofas_services(services)], repeat
+    )
+    payload, stages["serialize"] = timed(
+        lambda: json.dumps(entries).encode("utf-8"), repeat
+    )
+
+    def compress():
+        with EncryptedZipWriter(io.BytesIO(), PASSWORD, COMPRESSION_LEVEL) as archive:
+            archive.writestr(RAIVO_EXPORT_NAME, payload)
+
+    _, stages["zip"] = timed(compress, repeat)
+
+    def total():
+        clear_key_cache()
+        convert_2fas_to_raivo(src_file, work_dir.joinpath("export.zip"), PASSWORD)
+
+    _, stages["total"] = timed(total, repeat)
+
+    return [
+        {
+            "services": count,
+            "stage": stage,
+            "best": min(timings),
+            "mean": sum(timings) / len(timings),
+            "runs": len(timings),
+            "input_bytes": src_file.stat().st_size,
+        }
+        for stage, timings in stages.items()
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for count in args.sizes:
+            results.extend(bench_size(count, args.repeat, Path(temp_dir)))
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "results": results,
+    }
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
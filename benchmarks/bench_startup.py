@@ -0,0 +1,70 @@
+"""Measure CLI startup: import time of src.main and `--help` wall time.
+
+Usage: python -m benchmarks.bench_startup [--repeat 10] [-o results.json]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+# Modules only needed once a conversion actually runs
+HEAVY_MODULES = (
+    "cryptography",
+    "loguru",
+    "multiprocessing",
+    "asyncio",
+    "pyminizip",
+    "tempfile",
+)
+
+PROBE = (
+    "import sys, time; start = time.perf_counter(); import src.main; "
+    "elapsed = time.perf_counter() - start; "
+    f"print(elapsed, *[m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+)
+
+
+def best_of(command: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("-o", "--output", type=str, default=None)
+    args = parser.parse_args()
+
+    imports = []
+    for _ in range(args.repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE], check=True, capture_output=True, text=True
+        ).stdout.split()
+        imports.append(float(out[0]))
+    loaded = out[1:]
+
+    result = {
+        "python": sys.version.split()[0],
+        "repeat": args.repeat,
+        "interpreter_seconds": best_of([sys.executable, "-c", "pass"], args.repeat),
+        "import_seconds": min(imports),
+        "help_seconds": best_of(
+            [sys.executable, "-m", "src.main", "--help"], args.repeat
+        ),
+        "heavy_modules_loaded": loaded,
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    return result
+
+
+if __name__ == "__main__":
+    main()
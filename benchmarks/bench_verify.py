@@ -0,0 +1,46 @@
+"""Time the OTP verification of converted entries against their 2FAS source.
+
+Usage: python -m benchmarks.bench_verify [--sizes 1000 10000 50000] [--steps 1 10]
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.synthetic import make_services
+from src.raivo import RaivoEntry
+from src.verify import verify_services
+
+START_TIME = 1700000000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--steps", type=int, nargs="+", default=[1, 10])
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        services = make_services(size)
+        entries = [e.asdict() for e in RaivoEntry.from_twofas_services(services)]
+        for steps in args.steps:
+            timestamps = [START_TIME + 30 * i for i in range(steps)]
+            start = time.perf_counter()
+            report = verify_services(services, entries, timestamps)
+            seconds = time.perf_counter() - start
+            results.append(
+                {
+                    "services": size,
+                    "steps": steps,
+                    "codes": report.codes,
+                    "seconds": seconds,
+                    "codes_per_second": 2 * report.codes / seconds,
+                }
+            )
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Compare zipping a Raivo export with the built-in writer and with pyminizip.
+
+Usage: python -m benchmarks.bench_zip [--sizes 1000 20000] [--repeat 3] [-o results.json]
+"""
+
+import argparse
+import importlib.util
+import io
+import json
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from benchmarks.synthetic import make_services
+from src.archive import COMPRESSION_LEVEL, EncryptedZipWriter, compress_data
+from src.raivo import RAIVO_EXPORT_NAME, RaivoEntry
+
+PASSWORD = "benchmark"
+
+
+def zip_builtin(payload: bytes, dst_file: Path, compression_level: int):
+    with open(dst_file, "wb") as f:
+        with EncryptedZipWriter(f, PASSWORD, compression_level) as zip_file:
+            zip_file.writestr(RAIVO_EXPORT_NAME, payload)
+
+
+def zip_pyminizip(payload: bytes, dst_file: Path, compression_level: int):
+    compress_data(dst_file, RAIVO_EXPORT_NAME, payload, PASSWORD, compression_level)
+
+
+def best_of(repeat: int, func, *args) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 20000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--compression-level", type=int, default=COMPRESSION_LEVEL)
+    parser.add_argument("-o", "--output", type=str, default=None)
+    args = parser.parse_args()
+
+    writers = {"builtin": zip_builtin}
+    if importlib.util.find_spec("pyminizip") is not None:
+        writers["pyminizip"] = zip_pyminizip
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            entries = [
+                e.asdict() for e in RaivoEntry.from_twofas_services(make_services(size))
+            ]
+            payload = json.dumps(entries).encode("utf-8")
+            for name, func in writers.items():
+                dst_file = Path(tmp_dir, f"{name}.zip")
+                seconds = best_of(
+                    args.repeat, func, payload, dst_file, args.compression_level
+                )
+                with zipfile.ZipFile(io.BytesIO(dst_file.read_bytes())) as zip_file:
+                    correct = (
+                        zip_file.read(RAIVO_EXPORT_NAME, pwd=PASSWORD.encode())
+                        == payload
+                    )
+                results.append(
+                    {
+                        "entries": size,
+                        "writer": name,
+                        "correct": correct,
+                        "bytes_in": len(payload),
+                        "seconds": seconds,
+                        "mib_per_second": len(payload) / seconds / 1024 / 1024,
+                    }
+                )
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
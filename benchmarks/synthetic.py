@@ -0,0 +1,90 @@
+"""Generate synthetic 2FAS vaults of arbitrary size.
+
+Usage: python -m benchmarks.synthetic -n 1000 -o vault.2fas [--password PASSWORD]
+"""
+
+import argparse
+import base64
+import json
+import random
+from pathlib import Path
+
+from src.crypto import encrypt_ciphertext
+from src.twofas import TwofasEntry
+
+BASE32_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ234567"
+ALGORITHMS = ["SHA1", "SHA256", "SHA512"]
+SALT_LENGTH = 32
+IV_LENGTH = 12
+
+
+def make_services(count: int, seed: int = 0) -> list:
+    """Build 'count' services following the 2FAS schema of TwofasEntry"""
+    rng = random.Random(seed)
+    services = []
+    for i in range(count):
+        hotp = rng.random() < 0.1
+        entry = TwofasEntry(
+            name=f"Service {i}",
+            secret="".join(rng.choices(BASE32_ALPHABET, k=rng.choice([16, 32]))),
+            otp={
+                "account": f"user{i}@example.com",
+                "digits": rng.choice([6, 8]),
+                "counter": rng.randrange(1000) if hotp else 0,
+                "source": "manual",
+                "algorithm": rng.choice(ALGORITHMS),
+                "tokenType": "HOTP" if hotp else "TOTP",
+                "period": 30,
+            },
+            updated_at=1735590271000 + i,
+            order={"position": i},
+        )
+        services.append(entry.asdict())
+    return services
+
+
+def make_vault(count: int, password: str = None, seed: int = 0) -> dict:
+    """Build a .2fas document, encrypting its services when 'password' is set"""
+    services = make_services(count, seed)
+    vault = {
+        "appOrigin": "ios",
+        "schemaVersion": 4,
+        "servicesEncrypted": None,
+        "services": services,
+        "appVersionName": "5.3.9",
+        "appVersionCode": 50309,
+        "reference": "",
+        "groups": [],
+    }
+    if password:
+        rng = random.Random(seed)
+        salt, iv = rng.randbytes(SALT_LENGTH), rng.randbytes(IV_LENGTH)
+        cipher_text, auth_tag = encrypt_ciphertext(
+            json.dumps(services).encode("utf-8"), password.encode(), salt, iv
+        )
+        vault["servicesEncrypted"] = ":".join(
+            base64.b64encode(x).decode() for x in (cipher_text + auth_tag, salt, iv)
+        )
+        vault["services"] = []
+    return vault
+
+
+def write_vault(path: Path, count: int, password: str = None, seed: int = 0) -> Path:
+    """Write a synthetic .2fas file to 'path'"""
+    with open(path, "w") as f:
+        json.dump(make_vault(count, password, seed), f)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--services", type=int, default=1000)
+    parser.add_argument("-o", "--output", type=Path, required=True)
+    parser.add_argument("--password", type=str, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_vault(args.output, args.services, args.password, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,13 +19,17 @@ setup(
     install_requires=[
         "cryptography==44.0.0",
         "loguru==0.7.3",
-        "pyminizip==0.2.6",
         "pytest==8.3.4",
         "pytest-cov==6.0.0",
     ],
+    extras_require={
+        "fast": ["orjson"],
+        "pyminizip": ["pyminizip==0.2.6"],
+    },
     entry_points={
         "console_scripts": [
             "twofas2raivo=src.main:main",
+            "twofas2raivo-server=src.server:main",
         ],
     },
 )
@@ -0,0 +1,29 @@
+from dataclasses import fields
+
+
+def to_camel_case(input_str: str) -> str:
+    """Convert snake_case string to camelCase"""
+    components = input_str.split("_")
+    return components[0] + "".join(x.title() for x in components[1:])
+
+
+def camel_case_keys(cls) -> tuple:
+    """Build the (field name, camelCase key) table of a dataclass once"""
+    return tuple((f.name, to_camel_case(f.name)) for f in fields(cls))
+
+
+class CamelCaseMixin:
+    """asdict() with camelCase keys, read from the class '_keys' table.
+
+    Set '_keys' with camel_case_keys once the dataclass is defined.
+    """
+
+    __slots__ = ()
+    _keys = ()
+
+    def to_camel_case(self, input_str: str) -> str:
+        """Convert snake_case string to camelCase"""
+        return to_camel_case(input_str)
+
+    def asdict(self) -> dict:
+        return {key: getattr(self, name) for name, key in self._keys}
@@ -0,0 +1,95 @@
+import io
+import queue
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from src.crypto import KeyCache
+from src.helpers import parse_2fas_data, read_2fas_file, to_raivo_file
+from src.metrics import stage
+
+
+class Converter:
+    """Reusable conversion session for long-lived workers.
+
+    A Converter owns every buffer a job needs (the Raivo entries list and the
+    output stream) and resets them after each job, so nothing carries over
+    between conversions. Derived keys live in its own 'key_cache' rather than
+    in the module-level cache; the camelCase key tables it relies on are
+    immutable class constants. A Converter is not thread-safe: give each
+    thread its own, e.g. through a ConverterPool.
+    """
+
+    def __init__(self, key_cache: KeyCache | None = None):
+        self.key_cache = KeyCache() if key_cache is None else key_cache
+        self.jobs = 0
+        self._entries = []
+        self._output = io.BytesIO()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def reset(self):
+        """Drop the state of the last job, keeping the buffers for reuse"""
+        self._entries.clear()
+        self._output.seek(0)
+        self._output.truncate()
+
+    def close(self):
+        """Reset and wipe the derived keys held by this converter"""
+        self.reset()
+        self.key_cache.clear()
+
+    def convert_bytes(self, data: bytes | BinaryIO, password: str = None) -> bytes:
+        """Convert the content of a .2fas file to a Raivo zip, in memory"""
+        if hasattr(data, "read"):
+            data = data.read()
+        try:
+            src = parse_2fas_data(data, password, key_cache=self.key_cache)
+            dst = to_raivo_file(src, None, password, self._entries)
+            with stage("save"):
+                dst.write(self._output)
+            self.jobs += 1
+            return self._output.getvalue()
+        finally:
+            self.reset()
+
+    def convert_file(self, src_file: Path, dst_file: Path, password: str = None):
+        """Convert a .2fas file to a Raivo-compatible export on disk"""
+        try:
+            src = read_2fas_file(src_file, password, key_cache=self.key_cache)
+            dst = to_raivo_file(src, dst_file, password, self._entries)
+            with stage("save"):
+                dst.save()
+            self.jobs += 1
+        finally:
+            self.reset()
+
+
+class ConverterPool:
+    """Fixed set of Converters sharing one key cache, handed out one per user"""
+
+    def __init__(self, size: int, key_cache: KeyCache | None = None):
+        if size <= 0:
+            raise ValueError("'size' must be > 0.")
+        self.key_cache = KeyCache() if key_cache is None else key_cache
+        self._converters = queue.LifoQueue()
+        for _ in range(size):
+            self._converters.put(Converter(self.key_cache))
+
+    @contextmanager
+    def acquire(self, timeout: float = None) -> Iterator[Converter]:
+        """Borrow a Converter, blocking until one is free"""
+        converter = self._converters.get(timeout=timeout)
+        try:
+            yield converter
+        finally:
+            converter.reset()
+            self._converters.put(converter)
+
+    def close(self):
+        """Wipe the shared key cache"""
+        self.key_cache.clear()
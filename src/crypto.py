@@ -1,36 +1,267 @@
-import json
-import os
-from pathlib import Path
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes, padding
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from src.metrics import stage
 
 ITERATIONS = 10000
 KEY_LENGTH = 256
-HASH = hashes.SHA256()
-ENCRYPTION_CIPHER = algorithms.AES
+KEY_CACHE_MAX_SIZE = 128
+KEY_CACHE_TTL = 300
+DEFAULT_KDF_BACKEND = "cryptography"
+# update_into() may hold back up to one AES block minus a byte
+AES_BUFFER_PADDING = 15
+_ZEROS = memoryview(bytes(64 * 1024))
 
 
-def derive_key(password: bytes, salt: bytes) -> bytes:
-    """Derive a key from the given password and salt using PBKDF2-HMAC."""
+def __getattr__(name: str):
+    # 'cryptography' is only imported once a key or cipher is actually needed
+    if name == "HASH":
+        from cryptography.hazmat.primitives import hashes
+
+        return hashes.SHA256()
+    if name == "ENCRYPTION_CIPHER":
+        from cryptography.hazmat.primitives.ciphers import algorithms
+
+        return algorithms.AES
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class KeyCache:
+    """Bounded LRU cache of derived keys, indexed by a digest of password and salt."""
+
+    def __init__(self, max_size: int = KEY_CACHE_MAX_SIZE, ttl: float = KEY_CACHE_TTL):
+        if max_size < 0:
+            raise ValueError("'max_size' must be >= 0.")
+        if ttl <= 0:
+            raise ValueError("'ttl' must be > 0.")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def digest(password: bytes, salt: bytes, iterations: int = ITERATIONS) -> bytes:
+        """Return the cache index for 'password', 'salt' and 'iterations'."""
+        h = hashlib.sha256()
+        for part in (password, salt):
+            h.update(len(part).to_bytes(8, "big"))
+            h.update(part)
+        h.update(iterations.to_bytes(8, "big"))
+        return h.digest()
+
+    def _lookup(self, index: bytes) -> bytearray | None:
+        entry = self._entries.get(index)
+        if entry is None:
+            return None
+        key, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._discard(index)
+            return None
+        self._entries.move_to_end(index)
+        return key
+
+    def get(
+        self, password: bytes, salt: bytes, iterations: int = ITERATIONS
+    ) -> bytes | None:
+        """Return the cached key, or None if missing or expired."""
+        index = self.digest(password, salt, iterations)
+        with self._lock:
+            key = self._lookup(index)
+            return None if key is None else bytes(key)
+
+    def get_into(
+        self,
+        password: bytes,
+        salt: bytes,
+        out: bytearray,
+        iterations: int = ITERATIONS,
+    ) -> bool:
+        """Copy the cached key into 'out' without an intermediate copy."""
+        index = self.digest(password, salt, iterations)
+        with self._lock:
+            key = self._lookup(index)
+            if key is None:
+                return False
+            out[:] = key
+            return True
+
+    def put(
+        self, password: bytes, salt: bytes, key: bytes, iterations: int = ITERATIONS
+    ):
+        """Store 'key', evicting the least recently used entries when full."""
+        if self.max_size == 0:
+            return
+        index = self.digest(password, salt, iterations)
+        with self._lock:
+            self._discard(index)
+            self._entries[index] = (bytearray(key), time.monotonic() + self.ttl)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+
+    def clear(self):
+        """Drop every cached key, overwriting its content first."""
+        with self._lock:
+            for index in list(self._entries):
+                self._discard(index)
+
+    def _discard(self, index: bytes):
+        entry = self._entries.pop(index, None)
+        if entry is not None:
+            key = entry[0]
+            key[:] = bytes(len(key))
+
+
+key_cache = KeyCache()
+
+
+def clear_key_cache():
+    """Wipe every key held by the module-level cache."""
+    key_cache.clear()
+
+
+def wipe(*buffers: bytearray | memoryview | None):
+    """Overwrite mutable buffers with zeros, skipping None."""
+    for buffer in buffers:
+        if buffer is None:
+            continue
+        # Zero in fixed-size steps rather than allocating a buffer-sized block
+        with memoryview(buffer) as view:
+            for start in range(0, len(view), len(_ZEROS)):
+                chunk = view[start : start + len(_ZEROS)]
+                chunk[:] = _ZEROS[: len(chunk)]
+
+
+def _cryptography_pbkdf2(
+    password: bytes, salt: bytes, iterations: int, out: bytearray
+) -> bytearray:
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
     kdf = PBKDF2HMAC(
-        algorithm=HASH,
-        length=KEY_LENGTH // 8,  # Output length in bytes
-        salt=salt,
-        iterations=ITERATIONS,
+        algorithm=hashes.SHA256(),
+        length=len(out),
+        salt=bytes(salt),
+        iterations=iterations,
         backend=default_backend(),
     )
-    return kdf.derive(password)
+    if hasattr(kdf, "derive_into"):
+        kdf.derive_into(password, out)
+    else:
+        # Older cryptography releases can only return a new bytes object
+        out[:] = kdf.derive(password)
+    return out
+
+
+def _hashlib_pbkdf2(
+    password: bytes, salt: bytes, iterations: int, out: bytearray
+) -> bytearray:
+    # hashlib can only return a new bytes object, which cannot be wiped
+    out[:] = hashlib.pbkdf2_hmac("sha256", password, salt, iterations, len(out))
+    return out
+
+
+# PBKDF2-HMAC-SHA256 implementations, each writing the key into 'out'
+KDF_BACKENDS = {
+    "cryptography": _cryptography_pbkdf2,
+    "hashlib": _hashlib_pbkdf2,
+}
+_kdf_backend = DEFAULT_KDF_BACKEND
+
+
+def get_kdf_backend() -> str:
+    """Return the name of the KDF backend used by default."""
+    return _kdf_backend
+
+
+def set_kdf_backend(name: str):
+    """Select the KDF backend used when derive_key is not given one."""
+    global _kdf_backend
+    if name not in KDF_BACKENDS:
+        raise ValueError(f"'name' must be one of: {', '.join(KDF_BACKENDS)}.")
+    _kdf_backend = name
+
+
+def derive_key(
+    password: bytes,
+    salt: bytes,
+    cache: KeyCache | None = key_cache,
+    out: bytearray | None = None,
+    iterations: int = ITERATIONS,
+    backend: str | None = None,
+) -> bytes | bytearray:
+    """Derive a key from the given password and salt using PBKDF2-HMAC.
+
+    When 'out' is given the key is written into it and 'out' is returned, so
+    the caller can wipe the only copy it holds. 'backend' names one of
+    KDF_BACKENDS and defaults to the one set with set_kdf_backend.
+    """
+    if out is None:
+        if cache is not None:
+            key = cache.get(password, salt, iterations)
+            if key is not None:
+                return key
+        key = _pbkdf2(password, salt, iterations, backend)
+    else:
+        if cache is not None and cache.get_into(password, salt, out, iterations):
+            return out
+        key = _pbkdf2_into(password, salt, out, iterations, backend)
+    if cache is not None:
+        cache.put(password, salt, key, iterations)
+    return key
+
+
+def _pbkdf2(
+    password: bytes,
+    salt: bytes,
+    iterations: int = ITERATIONS,
+    backend: str | None = None,
+) -> bytes:
+    out = bytearray(KEY_LENGTH // 8)  # Output length in bytes
+    try:
+        return bytes(_pbkdf2_into(password, salt, out, iterations, backend))
+    finally:
+        wipe(out)
+
+
+def _pbkdf2_into(
+    password: bytes,
+    salt: bytes,
+    out: bytearray,
+    iterations: int = ITERATIONS,
+    backend: str | None = None,
+) -> bytearray:
+    if iterations <= 0:
+        raise ValueError("'iterations' must be > 0.")
+    name = _kdf_backend if backend is None else backend
+    if name not in KDF_BACKENDS:
+        raise ValueError(f"'backend' must be one of: {', '.join(KDF_BACKENDS)}.")
+    return KDF_BACKENDS[name](password, salt, iterations, out)
 
 
 def aes_gcm(
-    text: bytes, master_key: bytes, iv: bytes, encrypt: bool, auth_tag: bytes = None
+    text: bytes,
+    master_key: bytes,
+    iv: bytes,
+    encrypt: bool,
+    auth_tag: bytes = None,
+    out: bytearray | None = None,
 ) -> tuple:
-    """Perform AES-GCM encryption/decryption."""
+    """Perform AES-GCM encryption/decryption.
+
+    When decrypting into 'out' (at least len(text) + AES_BUFFER_PADDING
+    bytes), the plaintext is returned as a memoryview over it.
+    """
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
     cipher = Cipher(
-        ENCRYPTION_CIPHER(master_key),
+        algorithms.AES(master_key),
         modes.GCM(iv, auth_tag) if not encrypt else modes.GCM(iv),
         backend=default_backend(),
     )
@@ -40,29 +271,68 @@ def aes_gcm(
         ciphertext = encryptor.update(text) + encryptor.finalize()
         return ciphertext, encryptor.tag
     try:
-        plaintext = encryptor.update(text) + encryptor.finalize()
-        return plaintext, auth_tag
+        if out is None:
+            plaintext = encryptor.update(text) + encryptor.finalize()
+            return plaintext, auth_tag
+        size = encryptor.update_into(text, out)
+        encryptor.finalize()
+        return memoryview(out)[:size], auth_tag
     except Exception as exc:
+        # Never leave unauthenticated plaintext behind
+        wipe(out)
         raise ValueError("Decryption failed") from exc
 
 
 def decrypt_ciphertext(
-    cipher_text: bytes, password: bytes, salt: bytes, iv: bytes, auth_tag: bytes
+    cipher_text: bytes,
+    password: bytes,
+    salt: bytes,
+    iv: bytes,
+    auth_tag: bytes,
+    cache: KeyCache | None = key_cache,
+    out: bytearray | None = None,
+    iterations: int = ITERATIONS,
 ) -> tuple:
-    """Decrypt 'cipher_text' and return its plaintext and authentication tag."""
+    """Decrypt 'cipher_text' and return its plaintext and authentication tag.
+
+    The plaintext is decrypted in place into a preallocated bytearray, or into
+    'out' (returned as a memoryview over it), so the caller can wipe it. The
+    derived key only lives in a local buffer that is wiped before returning.
+    """
+    buffer = bytearray(len(cipher_text) + AES_BUFFER_PADDING) if out is None else out
+    master_key = bytearray(KEY_LENGTH // 8)
     try:
-        master_key = derive_key(password, salt)
-        return aes_gcm(cipher_text, master_key, iv, encrypt=False, auth_tag=auth_tag)
+        with stage("kdf"):
+            derive_key(password, salt, cache, master_key, iterations)
+        with stage("aes_gcm") as counters:
+            counters["bytes_in"] = len(cipher_text)
+            plain_text, auth_tag = aes_gcm(
+                cipher_text, master_key, iv, False, auth_tag, buffer
+            )
     except Exception as exc:
         raise ValueError(f"Failed to derive cipher key. {str(exc)}")
+    finally:
+        wipe(master_key)
+    if out is not None:
+        return plain_text, auth_tag
+    size = len(plain_text)
+    plain_text.release()
+    # Drop the padding in place: shrinking a bytearray does not copy it
+    del buffer[size:]
+    return buffer, auth_tag
 
 
 def encrypt_ciphertext(
-    plain_text: bytes, password: bytes, salt: bytes, iv: bytes
+    plain_text: bytes,
+    password: bytes,
+    salt: bytes,
+    iv: bytes,
+    cache: KeyCache | None = key_cache,
+    iterations: int = ITERATIONS,
 ) -> tuple:
     """Encrypt 'encrypt_ciphertext' and return its cipher_text and authentication tag."""
     try:
-        master_key = derive_key(password, salt)
+        master_key = derive_key(password, salt, cache, iterations=iterations)
         return aes_gcm(plain_text, master_key, iv, encrypt=True)
     except Exception as exc:
         raise ValueError(f"Failed to derive cipher key. {str(exc)}")
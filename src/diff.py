@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+from src.archive import COMPRESSION_LEVEL
+from src.helpers import read_2fas_file, to_raivo_file
+from src.merge import normalize_secret
+from src.metrics import stage
+from src.raivo import RaivoFile
+from src.verify import read_raivo_entries
+
+
+def entry_key(entry: dict) -> tuple:
+    """Return the (issuer, account, secret digest) identity of a Raivo entry"""
+    secret = normalize_secret(entry.get("secret")).encode("utf-8")
+    return (
+        entry.get("issuer"),
+        entry.get("account"),
+        hashlib.sha256(secret).hexdigest(),
+    )
+
+
+def entry_label(entry: dict) -> dict:
+    """Identify an entry in the summary without exposing its secret"""
+    return {"issuer": entry.get("issuer"), "account": entry.get("account")}
+
+
+@dataclass
+class DiffResult:
+    """Entries added, changed and removed since a previous Raivo export"""
+
+    added: List[dict] = field(default_factory=list)
+    changed: List[dict] = field(default_factory=list)
+    removed: List[dict] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def delta(self) -> List[dict]:
+        """The entries to import on top of the previous export"""
+        return self.added + self.changed
+
+    def summary(self) -> dict:
+        return {
+            "added": [entry_label(entry) for entry in self.added],
+            "changed": [entry_label(entry) for entry in self.changed],
+            "removed": [entry_label(entry) for entry in self.removed],
+            "unchanged": self.unchanged,
+        }
+
+
+def diff_entries(previous: List[dict], current: List[dict]) -> DiffResult:
+    """Compare two lists of Raivo entries in linear time.
+
+    The previous entries are indexed once by (issuer, account, secret
+    digest); each current entry is then looked up in that index. Entries
+    sharing a key are matched in order, so duplicates are neither lost nor
+    compared against each other.
+    """
+
+    result = DiffResult()
+    with stage("diff") as counters:
+        index: Dict[tuple, deque] = {}
+        for entry in previous:
+            index.setdefault(entry_key(entry), deque()).append(entry)
+        for entry in current:
+            matches = index.get(entry_key(entry))
+            if not matches:
+                result.added.append(entry)
+                continue
+            old = matches.popleft()
+            if old == entry:
+                result.unchanged += 1
+            else:
+                result.changed.append(entry)
+        for matches in index.values():
+            result.removed.extend(matches)
+        counters["entries"] = len(current)
+    return result
+
+
+def diff_2fas_to_raivo(
+    src_file: Path,
+    previous_file: Path,
+    dst_file: Path,
+    password: str = None,
+    compression_level: int = COMPRESSION_LEVEL,
+) -> DiffResult:
+    """Write a delta Raivo export holding the entries that are new or changed.
+
+    'previous_file' is a Raivo export protected by the same 'password'. The
+    delta archive is written to 'dst_file' and a summary of the added,
+    changed and removed entries, without secrets, next to it as
+    '<name>.summary.json'.
+    """
+
+    with stage("read_raivo"):
+        previous = read_raivo_entries(previous_file, password)
+    current = to_raivo_file(read_2fas_file(src_file, password), None, password)
+    result = diff_entries(previous, current.services)
+
+    dst = RaivoFile(dst_file, password, result.delta, compression_level)
+    with stage("save"):
+        dst.save()
+
+    summary_file = dst.file_path.with_name(f"{dst.file_path.stem}.summary.json")
+    tmp_file = summary_file.with_name(f"{summary_file.name}.tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(result.summary(), f, indent=2)
+    os.replace(tmp_file, summary_file)
+
+    return result
@@ -1,13 +1,31 @@
-import json
 import os
-from getpass import getpass
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
-
-import pyminizip
+from typing import BinaryIO, Iterator, List
 
+from src.archive import COMPRESSION_LEVEL, get_zip_backend, set_zip_backend
+from src.crypto import KeyCache, get_kdf_backend, key_cache, set_kdf_backend
+from src.loader import InputLimits, input_limits, load_2fas_data, load_2fas_file
+from src.manifest import Manifest
+from src.metrics import stage
 from src.raivo import RaivoEntry, RaivoFile
+from src.stream import CHUNK_SIZE, iter_array_items
 from src.twofas import TwofasEntry, TwofasFile
+from src.validation import ValidationError, ValidationReport, validate_services
+from src.writers import DEFAULT_FORMAT, get_output_file, open_writer, save_entries
+
+
+@dataclass
+class ConversionResult:
+    src_file: Path
+    dst_file: Path
+    success: bool
+    error: str | None = None
+    elapsed: float = 0.0
+    size: int = 0
+    skipped: bool = False
+    issues: int = 0
 
 
 def get_2fas_files(src_dir: Path) -> List[Path]:
@@ -22,8 +40,10 @@ def get_2fas_files(src_dir: Path) -> List[Path]:
     return [Path(x) for x in src_dir.glob("*.2fas") if x.is_file()]
 
 
-def get_file_to_process(files_list: List[Path]) -> Path:
-    """Get user-selected file to process"""
+def get_file_to_process(
+    files_list: List[Path], details: List[str] | None = None
+) -> Path:
+    """Get user-selected file to process, showing 'details' next to each path"""
 
     if len(files_list) == 0:
         raise ValueError("'files_list' must contain at least one Path object.")
@@ -34,13 +54,14 @@ def get_file_to_process(files_list: List[Path]) -> Path:
     print("Choose a file to process:\n")
 
     for item in enumerate(files_list):
+        label = f"{item[1]} [{details[item[0]]}]" if details else f"{item[1]}"
         (
-            print(f"{item[0]}) {item[1]}")
+            print(f"{item[0]}) {label}")
             if item[0] < len(files_list) - 1
-            else print(f"{item[0]}) {item[1]}\n")
+            else print(f"{item[0]}) {label}\n")
         )
 
-    while selection < 0 or selection > len(files_list) -1:
+    while selection < 0 or selection > len(files_list) - 1:
         try:
             selection = int(input("Selection: "))
         except ValueError:
@@ -51,41 +72,314 @@ def get_file_to_process(files_list: List[Path]) -> Path:
     return files_list[selection]
 
 
-def convert_2fas_to_raivo(src_file: Path, dst_file: Path, password: str = None):
-    """Convert .2fas file to Raivo-compatible export"""
+def twofas_service_to_raivo(service: dict) -> RaivoEntry | None:
+    """Map a 2FAS service to its Raivo entry, or None if it has no 'otp'"""
+    return RaivoEntry.from_twofas_service(service)
+
+
+def parse_2fas_data(
+    raw: bytes,
+    password: str = None,
+    file_path: Path = None,
+    key_cache: KeyCache | None = key_cache,
+    limits: InputLimits = input_limits,
+) -> TwofasFile:
+    """Parse the content of a .2fas file, decrypting its services if needed"""
+
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    return load_2fas_data(raw, password, file_path, key_cache, limits)
+
+
+def read_2fas_file(
+    src_file: Path,
+    password: str = None,
+    key_cache: KeyCache | None = key_cache,
+    limits: InputLimits = input_limits,
+) -> TwofasFile:
+    """Load a .2fas file within 'limits', decrypting its services if needed"""
+
+    return load_2fas_file(src_file, password, key_cache, limits)
+
+
+def convert_2fas_bytes(data: bytes | BinaryIO, password: str = None) -> bytes:
+    """Convert the content of a .2fas file to a Raivo zip, entirely in memory.
+
+    'data' may be bytes or a binary file-like object. Nothing is read from or
+    written to the filesystem, and no state is shared between calls apart from
+    the thread-safe derived key cache, so it can be called from many threads.
+    """
+
+    if hasattr(data, "read"):
+        data = data.read()
+
+    dst = to_raivo_file(parse_2fas_data(data, password), None, password)
+
+    with stage("save"):
+        return dst.to_bytes()
 
-    with open(src_file, "r") as f:
-        data = json.load(f)
 
-    src = TwofasFile(
-        file_path=src_file,
-        services_encrypted=(
-            data.get("servicesEncrypted") if "servicesEncrypted" in data else None
-        ),
-        services=data.get("services") if "services" in data else [],
-        groups=data.get("groups") if "groups" in data else [],
-        reference=data.get("reference") if "reference" in data else None,
+def check_services(
+    services: list, report: ValidationReport | None = None, strict: bool = False
+):
+    """Validate 'services' into 'report', raising ValidationError in 'strict' mode"""
+    if report is not None or strict:
+        report = validate_services(services, report)
+        if strict and not report.ok:
+            raise ValidationError(report)
+
+
+def to_raivo_file(
+    src: TwofasFile,
+    dst_file: Path | None,
+    password: str = None,
+    services: list | None = None,
+    compression_level: int = COMPRESSION_LEVEL,
+    report: ValidationReport | None = None,
+    strict: bool = False,
+):
+    """Map the services of a decrypted TwofasFile to a RaivoFile.
+
+    Entries are appended to 'services' when given, so callers may reuse a list.
+    The services are validated into 'report' when one is given, and in
+    'strict' mode ValidationError is raised before anything is mapped.
+    """
+
+    check_services(src.services, report, strict)
+
+    dst = RaivoFile(
+        file_path=dst_file,
         password=password,
+        services=services,
+        compression_level=compression_level,
     )
 
-    if src.encrypted:
-        src.decrypt()
-
-    dst = RaivoFile(file_path=dst_file, password=password)
-
-    for service in src.services:
-        r_service = RaivoEntry(
-            issuer=service.get("name"),
-            account=service.get("otp").get("account"),
-            secret=service.get("secret"),
-            algorithm=service.get("otp").get("algorithm"),
-            timer=str(service.get("otp").get("period")),
-            counter=str(service.get("otp").get("counter")),
-            kind=service.get("otp").get("tokenType"),
-            digits=str(service.get("otp").get("digits")),
+    with stage("map") as counters:
+        dst.services.extend(
+            entry.asdict() for entry in RaivoEntry.from_twofas_services(src.services)
         )
-        dst.services.append(r_service.asdict())
+        counters["entries"] = len(dst.services)
+
+    return dst
+
 
-    dst.save()
+def convert_2fas_to_raivo(
+    src_file: Path,
+    dst_file: Path,
+    password: str = None,
+    compression_level: int = COMPRESSION_LEVEL,
+    report: ValidationReport | None = None,
+    strict: bool = False,
+    output_format: str = DEFAULT_FORMAT,
+    limits: InputLimits = input_limits,
+):
+    """Convert .2fas file to Raivo-compatible export.
+
+    Formats other than the Raivo zip are written by their streaming writer,
+    mapping one service at a time instead of building a RaivoFile.
+    """
+
+    src = read_2fas_file(src_file, password, limits=limits)
+    if output_format != DEFAULT_FORMAT:
+        check_services(src.services, report, strict)
+        with stage("save") as counters:
+            counters["entries"] = save_entries(
+                (
+                    entry.asdict()
+                    for entry in map(twofas_service_to_raivo, src.services)
+                    if entry is not None
+                ),
+                get_output_file(dst_file, output_format),
+                output_format,
+                password,
+                compression_level,
+            )
+        return
+
+    dst = to_raivo_file(
+        src,
+        dst_file,
+        password,
+        compression_level=compression_level,
+        report=report,
+        strict=strict,
+    )
+
+    with stage("save"):
+        dst.save()
 
     return
+
+
+def stream_2fas_to_raivo(
+    src_file: Path,
+    dst_file: Path,
+    password: str = None,
+    chunk_size: int = CHUNK_SIZE,
+    compression_level: int = COMPRESSION_LEVEL,
+    report: ValidationReport | None = None,
+    strict: bool = False,
+    output_format: str = DEFAULT_FORMAT,
+) -> int:
+    """Convert an unencrypted .2fas file one service at a time.
+
+    Services are read, mapped and written by the 'output_format' writer as
+    they are parsed, so memory use does not depend on the number of services.
+    Services are validated as they go by; in 'strict' mode the partial output
+    is removed and ValidationError raised at the end. Returns the number of
+    converted services.
+    """
+
+    if report is None and strict:
+        report = ValidationReport()
+
+    dst_file = get_output_file(dst_file, output_format)
+
+    fields = {}
+    with open(src_file, "r", encoding="utf-8") as src, open_writer(
+        dst_file, output_format, password, compression_level
+    ) as writer:
+        for service in iter_array_items(src, "services", fields, chunk_size):
+            if report is not None:
+                report.check(service)
+            entry = twofas_service_to_raivo(service)
+            if entry is not None:
+                writer.write(entry.asdict())
+        if writer.count == 0 and fields.get("servicesEncrypted"):
+            raise ValueError("Streaming conversion only supports unencrypted backups.")
+        if strict and not report.ok:
+            raise ValidationError(report)
+
+    return writer.count
+
+
+def worker_backends() -> tuple:
+    """The KDF and zip backends of this process, as 'init_worker' arguments"""
+    return get_kdf_backend(), get_zip_backend()
+
+
+def init_worker(kdf_backend: str, zip_backend: str):
+    """Select the parent's backends, which spawned workers do not inherit"""
+    set_kdf_backend(kdf_backend)
+    set_zip_backend(zip_backend)
+
+
+def get_dst_file(src_file: Path, dst_dir: Path) -> Path:
+    """Build the Raivo export path for 'src_file' inside 'dst_dir'"""
+    return dst_dir.joinpath(f"{src_file.stem}.zip")
+
+
+def convert_2fas_file(
+    src_file: Path,
+    dst_file: Path,
+    password: str = None,
+    compression_level: int = COMPRESSION_LEVEL,
+    strict: bool = False,
+    limits: InputLimits = input_limits,
+):
+    """Convert a single file, reporting the outcome instead of raising"""
+    start = time.perf_counter()
+    report = ValidationReport()
+    try:
+        convert_2fas_to_raivo(
+            src_file,
+            dst_file,
+            password,
+            compression_level,
+            report,
+            strict,
+            limits=limits,
+        )
+    except Exception as exc:
+        return ConversionResult(
+            src_file=src_file,
+            dst_file=dst_file,
+            success=False,
+            error=str(exc),
+            elapsed=time.perf_counter() - start,
+            issues=len(report.issues),
+        )
+    return ConversionResult(
+        src_file=src_file,
+        dst_file=dst_file,
+        success=True,
+        elapsed=time.perf_counter() - start,
+        size=src_file.stat().st_size,
+        issues=len(report.issues),
+    )
+
+
+def convert_2fas_files(
+    src_files: List[Path],
+    dst_dir: Path,
+    password: str = None,
+    max_workers: int = None,
+    manifest: Manifest | None = None,
+    compression_level: int = COMPRESSION_LEVEL,
+    strict: bool = False,
+    limits: InputLimits = input_limits,
+) -> Iterator[ConversionResult]:
+    """Convert many .2fas files in parallel, yielding results as they complete.
+
+    When a 'manifest' is given, files whose source and output did not change
+    since the recorded conversion are skipped, and the manifest is updated.
+    """
+
+    if not isinstance(dst_dir, Path):
+        raise TypeError("'dst_dir' is not a valid Path object.")
+
+    if len(src_files) == 0:
+        return
+
+    dst_dir.mkdir(parents=True, exist_ok=True)
+
+    options = (
+        manifest.options_digest(password, compression_level=compression_level)
+        if manifest is not None
+        else None
+    )
+    pending = []
+    for src_file in src_files:
+        dst_file = get_dst_file(src_file, dst_dir)
+        if manifest is not None and manifest.is_current(src_file, dst_file, options):
+            yield ConversionResult(
+                src_file=src_file, dst_file=dst_file, success=True, skipped=True
+            )
+        else:
+            pending.append((src_file, dst_file))
+
+    if len(pending) == 0:
+        if manifest is not None:
+            manifest.save()
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    workers = min(max_workers or os.cpu_count() or 1, len(pending))
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=worker_backends(),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    convert_2fas_file,
+                    src_file,
+                    dst_file,
+                    password,
+                    compression_level,
+                    strict,
+                    limits,
+                )
+                for src_file, dst_file in pending
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                if manifest is not None and result.success:
+                    manifest.record(result.src_file, result.dst_file, options)
+                yield result
+    finally:
+        if manifest is not None:
+            manifest.save()
@@ -0,0 +1,169 @@
+import json
+import mmap
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from src.crypto import KeyCache, key_cache
+from src.metrics import stage
+from src.scan import MMAP_THRESHOLD, count_services
+from src.twofas import TwofasFile
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MAX_FILE_SIZE = 64 * 1024 * 1024
+MAX_SERVICES = 100_000
+
+# Top-level key only: a quote inside a JSON string is always escaped
+_SERVICES_ENCRYPTED = re.compile(rb'"servicesEncrypted"\s*:\s*"')
+
+
+@dataclass(slots=True)
+class InputLimits:
+    """Upper bounds on the size and content of the backups that are loaded"""
+
+    max_file_size: int = MAX_FILE_SIZE
+    max_services: int = MAX_SERVICES
+
+    def check_size(self, size: int):
+        if size > self.max_file_size:
+            raise ValueError(
+                f"Backup is {size} bytes, over the limit of {self.max_file_size}."
+            )
+
+    def check_services(self, count: int):
+        if count > self.max_services:
+            raise ValueError(
+                f"Backup has {count} services, over the limit of {self.max_services}."
+            )
+
+
+input_limits = InputLimits()
+
+
+def _loads(data: bytes | memoryview):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.tobytes() if isinstance(data, memoryview) else data)
+
+
+def find_services_encrypted(data: bytes | mmap.mmap) -> tuple | None:
+    """Locate the 'servicesEncrypted' string value as a (start, end) span"""
+    match = _SERVICES_ENCRYPTED.search(data)
+    if match is None:
+        return None
+    # Base64 has no quotes, so the first one closes the string
+    end = data.find(b'"', match.end())
+    if end == -1:
+        raise ValueError("Invalid JSON: unterminated 'servicesEncrypted'.")
+    return match.end(), end
+
+
+def split_fields(
+    data: bytes | mmap.mmap, view: memoryview, start: int, end: int
+) -> list:
+    """Split the 'servicesEncrypted' span into views of its base64 fields.
+
+    Escaped slashes ('\\/') are left in place: the base64 decoder skips the
+    backslashes. Any other escape is decoded as a JSON string instead.
+    """
+    pos = data.find(b"\\", start, end)
+    while pos != -1:
+        if data[pos + 1 : pos + 2] != b"/":
+            return _loads(view[start - 1 : end + 1].tobytes()).split(":")
+        pos = data.find(b"\\", pos + 2, end)
+    fields, pos = [], start
+    while (separator := data.find(b":", pos, end)) != -1:
+        fields.append(view[pos:separator])
+        pos = separator + 1
+    fields.append(view[pos:end])
+    return fields
+
+
+def load_2fas_data(
+    data: bytes | mmap.mmap,
+    password: str = None,
+    file_path: Path = None,
+    key_cache: KeyCache | None = key_cache,
+    limits: InputLimits = input_limits,
+) -> TwofasFile:
+    """Load a .2fas document from a buffer, decrypting its services if needed.
+
+    The 'servicesEncrypted' blob is located in the raw bytes and base64
+    decoded straight from them; only the rest of the document is parsed as
+    JSON. Unencrypted services are counted before they are parsed.
+    """
+
+    limits.check_size(len(data))
+    view, fields = memoryview(data), []
+    try:
+        with stage("parse") as counters:
+            span = find_services_encrypted(data)
+            if span is None:
+                limits.check_services(count_services(data))
+                document = _loads(view)
+            else:
+                start, end = span
+                # The blob is left out and reads as an empty string
+                document = _loads(data[:start] + data[end:])
+            counters["bytes_in"] = len(data)
+
+        if not isinstance(document, dict):
+            raise ValueError("2FAS backup must be a JSON object.")
+
+        src = TwofasFile(
+            file_path=file_path,
+            services_encrypted=document.get("servicesEncrypted"),
+            services=document.get("services"),
+            groups=document.get("groups"),
+            reference=document.get("reference"),
+            password=password,
+        )
+
+        if span is not None and end > start and len(src.services) == 0:
+            fields = split_fields(data, view, start, end)
+            src.decrypt_fields(fields, key_cache)
+        elif src.encrypted:
+            src.decrypt(key_cache)
+
+        limits.check_services(len(src.services))
+        return src
+    finally:
+        # Views must be gone before a memory map can be closed
+        for field in fields:
+            if isinstance(field, memoryview):
+                field.release()
+        view.release()
+
+
+def load_2fas_file(
+    src_file: Path,
+    password: str = None,
+    key_cache: KeyCache | None = key_cache,
+    limits: InputLimits = input_limits,
+) -> TwofasFile:
+    """Load a .2fas file, memory-mapping it when it is larger than MMAP_THRESHOLD.
+
+    The size is checked before anything is read, and no more than the
+    checked size is ever mapped or read.
+    """
+
+    with stage("read") as counters:
+        size = os.stat(src_file).st_size
+        limits.check_size(size)
+        with open(src_file, "rb") as f:
+            if size > MMAP_THRESHOLD:
+                data = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            else:
+                data = f.read(size)
+        counters["bytes_in"] = size
+
+    try:
+        return load_2fas_data(data, password, src_file, key_cache, limits)
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
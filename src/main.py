@@ -1,17 +1,66 @@
 import argparse
+import atexit
+import json
+import signal
+import sys
+import time
 from getpass import getpass
 from pathlib import Path
 
-from loguru import logger
+from src.archive import (
+    COMPRESSION_LEVEL,
+    DEFAULT_ZIP_BACKEND,
+    ZIP_BACKENDS,
+    set_zip_backend,
+)
+from src.crypto import (
+    DEFAULT_KDF_BACKEND,
+    KDF_BACKENDS,
+    clear_key_cache,
+    set_kdf_backend,
+)
+from src.diff import diff_2fas_to_raivo
+from src.helpers import (
+    convert_2fas_files,
+    convert_2fas_to_raivo,
+    get_2fas_files,
+    get_file_to_process,
+    read_2fas_file,
+    stream_2fas_to_raivo,
+)
+from src.loader import MAX_FILE_SIZE, MAX_SERVICES, input_limits
+from src.manifest import MANIFEST_NAME, Manifest
+from src.merge import CONFLICT_POLICIES, merge_2fas_files
+from src.metrics import Metrics, collect, stage
+from src.reverse import TWOFAS_EXPORT_NAME, reverse_raivo_to_2fas
+from src.scan import SCAN_CACHE_NAME, Scanner, scan_backups
+from src.shard import shard_2fas_to_raivo
+from src.validation import MAX_REPORTED_ISSUES, ValidationReport
+from src.verify import verify_raivo_file
+from src.watcher import Watcher
+from src.writers import DEFAULT_FORMAT, WRITERS, get_output_file, get_writer
 
-from src.helpers import convert_2fas_to_raivo, get_2fas_files, get_file_to_process
+
+class _Logger:
+    """Import loguru and add the file sink on first use, not at startup"""
+
+    _logger = None
+
+    def __getattr__(self, name: str):
+        if _Logger._logger is None:
+            from loguru import logger
+
+            logs_dir = Path.joinpath(Path.cwd(), "logs")
+            logger.add(Path.joinpath(logs_dir, "conversion_{time}.log"), level="INFO")
+            _Logger._logger = logger
+        return getattr(_Logger._logger, name)
+
+
+logger = _Logger()
 
 
 def main():
     exec_dir = Path.cwd()
-    logs_dir = Path.joinpath(exec_dir, "logs")
-
-    logger.add(Path.joinpath(logs_dir, "conversion_{time}.log"), level="INFO")
 
     parser = argparse.ArgumentParser(
         prog="twofas2raivo",
@@ -39,7 +88,199 @@ def main():
         required=False,
         help="Specify if 2FAS backup is encrypted.",
     )
+    parser.add_argument(
+        "-b",
+        "--batch",
+        action="store_true",
+        required=False,
+        help="Convert every .2fas file in the source directory.",
+    )
+    parser.add_argument(
+        "--merge",
+        action="store_true",
+        required=False,
+        help="Merge every .2fas file in the source directory into one export.",
+    )
+    parser.add_argument(
+        "--conflict",
+        choices=CONFLICT_POLICIES,
+        default="newest",
+        required=False,
+        help="Which duplicate to keep when merging (default: newest).",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        required=False,
+        help="Watch the source directory and convert new or changed backups.",
+    )
+    parser.add_argument(
+        "--diff",
+        type=str,
+        default=None,
+        required=False,
+        metavar="PREVIOUS_EXPORT",
+        help="Only export entries added or changed since a previous Raivo export.",
+    )
+    parser.add_argument(
+        "--reverse",
+        action="store_true",
+        required=False,
+        help="Convert Raivo exports (a .zip or a directory of them) into an encrypted 2FAS backup.",
+    )
+    parser.add_argument(
+        "--scan",
+        action="store_true",
+        required=False,
+        help="List the .2fas files under the source directory with their metadata.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        required=False,
+        help="Skip backups whose output is up to date with the manifest.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        required=False,
+        help="Convert an unencrypted backup one service at a time.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(WRITERS),
+        default=DEFAULT_FORMAT,
+        required=False,
+        help=f"Output format of a single-file conversion (default: {DEFAULT_FORMAT}).",
+    )
+    parser.add_argument(
+        "--compression-level",
+        type=int,
+        choices=range(10),
+        default=COMPRESSION_LEVEL,
+        required=False,
+        metavar="{0-9}",
+        help=f"Deflate level of the output, 0 stores it uncompressed (default: {COMPRESSION_LEVEL}).",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=None,
+        required=False,
+        help="Split the export into this many archives written in parallel.",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        required=False,
+        help="Fail instead of warning when services have invalid OTP parameters.",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        required=False,
+        help="Check that the export generates the same OTP codes as the backup.",
+    )
+    parser.add_argument(
+        "--verify-at",
+        type=int,
+        nargs="+",
+        default=None,
+        required=False,
+        metavar="TIMESTAMP",
+        help="Unix timestamps to compare TOTP codes at (default: now).",
+    )
+    parser.add_argument(
+        "--kdf",
+        choices=list(KDF_BACKENDS),
+        default=DEFAULT_KDF_BACKEND,
+        required=False,
+        help=f"PBKDF2 implementation deriving the keys (default: {DEFAULT_KDF_BACKEND}).",
+    )
+    parser.add_argument(
+        "--zip-backend",
+        choices=list(ZIP_BACKENDS),
+        default=DEFAULT_ZIP_BACKEND,
+        required=False,
+        help="Zip implementation of the Raivo exports; pyminizip is faster but "
+        f"stages the plaintext in a temporary file (default: {DEFAULT_ZIP_BACKEND}).",
+    )
+    parser.add_argument(
+        "--max-file-size",
+        type=int,
+        default=MAX_FILE_SIZE,
+        required=False,
+        metavar="BYTES",
+        help=f"Refuse backups larger than this (default: {MAX_FILE_SIZE}).",
+    )
+    parser.add_argument(
+        "--max-services",
+        type=int,
+        default=MAX_SERVICES,
+        required=False,
+        metavar="COUNT",
+        help=f"Refuse backups with more services than this (default: {MAX_SERVICES}).",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        required=False,
+        help="Log a per-stage timing and memory report.",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=str,
+        default=None,
+        required=False,
+        help="Write the per-stage timing and memory report to a JSON file.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        required=False,
+        help="Number of worker processes used in batch mode.",
+    )
     args = parser.parse_args()
+    if args.format != DEFAULT_FORMAT and (
+        args.batch
+        or args.merge
+        or args.watch
+        or args.reverse
+        or args.diff is not None
+        or args.shards is not None
+        or args.verify
+    ):
+        parser.error(f"--format {args.format} only applies to single-file conversions.")
+    if args.stream and (
+        args.batch
+        or args.merge
+        or args.watch
+        or args.reverse
+        or args.diff is not None
+        or args.shards is not None
+    ):
+        parser.error("--stream only applies to single-file conversions.")
+    if args.incremental and (
+        args.merge
+        or args.watch
+        or args.reverse
+        or args.diff is not None
+        or args.shards is not None
+    ):
+        parser.error(
+            "--incremental only applies to --batch and single-file conversions."
+        )
+
+    set_kdf_backend(args.kdf)
+    try:
+        set_zip_backend(args.zip_backend)
+    except ImportError:
+        parser.error("--zip-backend pyminizip requires the pyminizip package.")
+    # Every mode reads backups through the loader's default limits
+    input_limits.max_file_size = args.max_file_size
+    input_limits.max_services = args.max_services
 
     src_file = (
         Path(args.source_file)
@@ -51,7 +292,53 @@ def main():
         if args.destination_file and args.destination_file != exec_dir
         else None
     )
-    password = getpass("Enter password: ") if args.encrypted else None
+    if args.scan:
+        scan(Path(args.source_file))
+        return
+
+    password = getpass("Enter password: ") if args.encrypted or args.reverse else None
+    # Derived keys are cached for reuse; wipe them whichever way we exit
+    atexit.register(clear_key_cache)
+
+    if args.reverse:
+        reverse(Path(args.source_file), dst_file, password, args.workers)
+        return
+
+    if args.merge:
+        merge(
+            Path(args.source_file),
+            dst_file,
+            password,
+            args.conflict,
+            args.compression_level,
+            args.strict,
+        )
+        return
+
+    if args.watch:
+        watch(
+            Path(args.source_file),
+            Path(args.destination_file),
+            password,
+            args.workers,
+            args.compression_level,
+            args.strict,
+        )
+        return
+
+    if args.batch:
+        src_dir = Path(args.source_file)
+        dst_dir = Path(args.destination_file)
+        batch_convert(
+            src_dir,
+            dst_dir,
+            password,
+            args.workers,
+            args.incremental,
+            args.compression_level,
+            args.strict,
+        )
+        return
 
     if (
         src_file is None
@@ -62,15 +349,18 @@ def main():
             f"No valid source file passed in input, scanning [{exec_dir}] for .2fas files..."
         )
         try:
-            twofas_files = get_2fas_files(exec_dir)
-            if len(twofas_files) == 0:
+            backups = scan_backups(exec_dir, recursive=False)
+            if len(backups) == 0:
                 logger.error("No .2fas files found. Exiting!")
                 return
-            logger.info(f"Files found: {len(twofas_files)}")
+            logger.info(f"Files found: {len(backups)}")
             src_file = (
-                get_file_to_process(twofas_files)
-                if len(twofas_files) > 1
-                else twofas_files[0]
+                get_file_to_process(
+                    [Path(info.path) for info in backups],
+                    [info.describe() for info in backups],
+                )
+                if len(backups) > 1
+                else Path(backups[0].path)
             )
         except Exception as exc:
             logger.error(f"{exc}")
@@ -80,19 +370,406 @@ def main():
         dst_file = Path.joinpath(exec_dir, f"raivo-otp-export.zip")
     if dst_file.is_dir():
         dst_file = Path.joinpath(dst_file, f"raivo-otp-export.zip")
+    dst_file = get_output_file(dst_file, args.format)
 
     logger.info(f"Source file: [{src_file}]")
     logger.info(f"Destination file: [{dst_file}]")
+    if not get_writer(args.format).encrypted:
+        logger.warning(
+            f"--format {args.format} writes the secrets unencrypted, "
+            f"keep [{dst_file}] private and delete it after use."
+        )
 
+    metrics = Metrics() if args.timings or args.metrics_file else None
+
+    if args.shards is not None:
+        shard(src_file, dst_file, password, args, metrics)
+        return
+
+    if args.diff is not None:
+        diff(src_file, Path(args.diff), dst_file, password, args, metrics)
+        return
+
+    report = ValidationReport()
     try:
-        convert_2fas_to_raivo(src_file, dst_file, password)
+        manifest, options = None, None
+        if args.incremental:
+            manifest = Manifest(dst_file.parent.joinpath(MANIFEST_NAME))
+            options = manifest.options_digest(
+                password,
+                stream=args.stream,
+                compression_level=args.compression_level,
+                output_format=args.format,
+            )
+            if manifest.is_current(src_file, dst_file, options):
+                logger.info(f"[{dst_file}] is up to date, nothing to do.")
+                manifest.save()
+                return
+        with collect(metrics), stage("convert"):
+            if args.stream:
+                stream_2fas_to_raivo(
+                    src_file,
+                    dst_file,
+                    password,
+                    compression_level=args.compression_level,
+                    report=report,
+                    strict=args.strict,
+                    output_format=args.format,
+                )
+            else:
+                convert_2fas_to_raivo(
+                    src_file,
+                    dst_file,
+                    password,
+                    args.compression_level,
+                    report,
+                    args.strict,
+                    args.format,
+                )
+        if manifest is not None:
+            manifest.record(src_file, dst_file, options)
+            manifest.save()
     except Exception as exc:
         logger.error(f"An error is occurred while converting the file: {exc}")
         return
 
+    log_report(report)
     logger.info("File converted successfully!")
+
+    if args.verify and not verify(
+        src_file, dst_file, password, args.verify_at, metrics
+    ):
+        sys.exit(1)
+
+    if metrics is not None:
+        write_metrics(metrics, args.timings, args.metrics_file)
     return
 
 
+def write_metrics(metrics: Metrics, log: bool, metrics_file: str | None):
+    """Log and/or write the collected per-stage metrics"""
+    report = metrics.report()
+    if log:
+        for record in report["stages"]:
+            logger.info(
+                f"{'  ' * record['depth']}{record['stage']}: "
+                f"wall {record['wall_seconds'] * 1000:.2f} ms, "
+                f"cpu {record['cpu_seconds'] * 1000:.2f} ms, "
+                f"peak {record.get('peak_memory_bytes', 0) / 1024:.1f} KiB"
+            )
+    if metrics_file:
+        with open(metrics_file, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Metrics written to [{metrics_file}]")
+
+
+def log_report(report: ValidationReport):
+    """Warn about the services that did not validate"""
+    if report.ok:
+        return
+    logger.warning(f"Validation found {report.summary()}:")
+    for issue in report.issues[:MAX_REPORTED_ISSUES]:
+        logger.warning(f"  {issue}")
+    if len(report.issues) > MAX_REPORTED_ISSUES:
+        logger.warning(f"  ... and {len(report.issues) - MAX_REPORTED_ISSUES} more")
+
+
+def verify(
+    src_file: Path,
+    dst_file: Path,
+    password: str,
+    timestamps: list | None,
+    metrics: Metrics | None,
+) -> bool:
+    """Compare the OTP codes of 'dst_file' with those of 'src_file'"""
+    try:
+        with collect(metrics):
+            src = read_2fas_file(src_file, password)
+            result = verify_raivo_file(src.services, dst_file, password, timestamps)
+    except Exception as exc:
+        logger.error(f"An error is occurred while verifying the file: {exc}")
+        return False
+
+    if not result.ok:
+        logger.error(f"Verification failed: {result.summary()}")
+        for mismatch in result.mismatches[:MAX_REPORTED_ISSUES]:
+            logger.error(f"  {mismatch}")
+        return False
+    logger.info(f"Verification passed: {result.summary()}")
+    return True
+
+
+def batch_convert(
+    src_dir: Path,
+    dst_dir: Path,
+    password: str,
+    workers: int,
+    incremental: bool,
+    compression_level: int = COMPRESSION_LEVEL,
+    strict: bool = False,
+):
+    """Convert every .2fas file in 'src_dir' and log the aggregate throughput"""
+    try:
+        twofas_files = get_2fas_files(src_dir)
+    except Exception as exc:
+        logger.error(f"{exc}")
+        return
+
+    if len(twofas_files) == 0:
+        logger.error("No .2fas files found. Exiting!")
+        return
+
+    logger.info(f"Files found: {len(twofas_files)}")
+    logger.info(f"Destination directory: [{dst_dir}]")
+
+    converted, skipped, failed, total_bytes = 0, 0, 0, 0
+    start = time.perf_counter()
+    try:
+        manifest = Manifest(dst_dir.joinpath(MANIFEST_NAME)) if incremental else None
+        for result in convert_2fas_files(
+            twofas_files,
+            dst_dir,
+            password,
+            workers,
+            manifest,
+            compression_level,
+            strict,
+        ):
+            log_result(result)
+            if result.skipped:
+                skipped += 1
+            elif result.success:
+                converted += 1
+                total_bytes += result.size
+            else:
+                failed += 1
+    except Exception as exc:
+        logger.error(f"An error is occurred while converting the files: {exc}")
+        return
+    elapsed = time.perf_counter() - start
+
+    logger.info(
+        f"Batch completed: {converted} converted, {skipped} skipped, {failed} failed "
+        f"in {elapsed:.3f}s "
+        f"({converted / elapsed:.2f} files/s, {total_bytes / elapsed / 1024:.1f} KiB/s)"
+    )
+    return
+
+
+def merge(
+    src_dir: Path,
+    dst_file: Path | None,
+    password: str,
+    policy: str,
+    compression_level: int = COMPRESSION_LEVEL,
+    strict: bool = False,
+):
+    """Merge every .2fas file in 'src_dir' into a single Raivo export"""
+    if dst_file is None:
+        dst_file = Path.joinpath(Path.cwd(), "raivo-otp-export.zip")
+    if dst_file.is_dir():
+        dst_file = Path.joinpath(dst_file, "raivo-otp-export.zip")
+
+    report = ValidationReport()
+    try:
+        twofas_files = get_2fas_files(src_dir)
+        if len(twofas_files) == 0:
+            logger.error("No .2fas files found. Exiting!")
+            return
+        logger.info(f"Files found: {len(twofas_files)}")
+        index = merge_2fas_files(
+            twofas_files,
+            dst_file,
+            password,
+            policy,
+            compression_level,
+            report,
+            strict,
+        )
+    except Exception as exc:
+        logger.error(f"An error is occurred while merging the files: {exc}")
+        return
+
+    log_report(report)
+
+    logger.info(
+        f"Merged {index.total} services into [{dst_file}]: "
+        f"{len(index)} kept, {index.duplicates} duplicates removed"
+    )
+
+
+def shard(
+    src_file: Path,
+    dst_file: Path,
+    password: str,
+    args: argparse.Namespace,
+    metrics: Metrics | None,
+):
+    """Convert 'src_file' into 'args.shards' archives tied by a manifest"""
+    report = ValidationReport()
+    try:
+        with collect(metrics), stage("convert"):
+            manifest = shard_2fas_to_raivo(
+                src_file,
+                dst_file,
+                password,
+                args.shards,
+                args.compression_level,
+                args.workers,
+                report,
+                args.strict,
+            )
+    except Exception as exc:
+        logger.error(f"An error is occurred while converting the file: {exc}")
+        return
+
+    log_report(report)
+
+    for described in manifest["shards"]:
+        logger.info(f"Shard [{described['file']}]: {described['services']} services")
+    logger.info(
+        f"File converted successfully into {len(manifest['shards'])} shards "
+        f"({manifest['services']} services)!"
+    )
+
+    if metrics is not None:
+        write_metrics(metrics, args.timings, args.metrics_file)
+
+
+def scan(src_dir: Path):
+    """Log every .2fas file under 'src_dir' with its header metadata"""
+    start = time.perf_counter()
+    try:
+        scanner = Scanner(src_dir.joinpath(SCAN_CACHE_NAME))
+        backups = scanner.scan(src_dir)
+        scanner.save()
+    except Exception as exc:
+        logger.error(f"An error is occurred while scanning [{src_dir}]: {exc}")
+        return
+    elapsed = time.perf_counter() - start
+
+    for info in backups:
+        logger.info(f"[{info.path}] {info.describe()}")
+    logger.info(
+        f"Scanned {len(backups)} .2fas files in {elapsed:.3f}s "
+        f"({scanner.misses} read, {scanner.hits} cached)"
+    )
+
+
+def diff(
+    src_file: Path,
+    previous_file: Path,
+    dst_file: Path,
+    password: str,
+    args: argparse.Namespace,
+    metrics: Metrics | None,
+):
+    """Export the entries of 'src_file' that are not in 'previous_file'"""
+    if previous_file.resolve() == dst_file.resolve():
+        logger.error("The delta export must not overwrite the previous export.")
+        return
+    try:
+        with collect(metrics), stage("convert"):
+            result = diff_2fas_to_raivo(
+                src_file, previous_file, dst_file, password, args.compression_level
+            )
+    except Exception as exc:
+        logger.error(f"An error is occurred while diffing the file: {exc}")
+        return
+
+    logger.info(
+        f"Delta written to [{dst_file}]: {len(result.added)} added, "
+        f"{len(result.changed)} changed, {len(result.removed)} removed, "
+        f"{result.unchanged} unchanged"
+    )
+    for entry in result.removed:
+        logger.warning(
+            f"Removed since the previous export: {entry.get('issuer')} "
+            f"({entry.get('account')}), delete it in Raivo"
+        )
+
+    if metrics is not None:
+        write_metrics(metrics, args.timings, args.metrics_file)
+
+
+def reverse(src: Path, dst_file: Path | None, password: str, workers: int):
+    """Convert the Raivo export(s) at 'src' into one encrypted 2FAS backup"""
+    if dst_file is None:
+        dst_file = Path.joinpath(Path.cwd(), TWOFAS_EXPORT_NAME)
+    if dst_file.is_dir():
+        dst_file = Path.joinpath(dst_file, TWOFAS_EXPORT_NAME)
+    if dst_file.suffix != ".2fas":
+        dst_file = dst_file.with_suffix(".2fas")
+
+    src_files = sorted(src.glob("*.zip")) if src.is_dir() else [src]
+    if len(src_files) == 0 or not all(f.is_file() for f in src_files):
+        logger.error("No Raivo exports found. Exiting!")
+        return
+    logger.info(f"Files found: {len(src_files)}")
+
+    try:
+        reverse_raivo_to_2fas(src_files, dst_file, password, workers)
+    except Exception as exc:
+        logger.error(f"An error is occurred while converting the files: {exc}")
+        return
+
+    logger.info(f"Backup written to [{dst_file}] from {len(src_files)} exports")
+
+
+def log_result(result):
+    if result.skipped:
+        logger.info(f"Skipped [{result.src_file}], [{result.dst_file}] is up to date")
+    elif result.success:
+        logger.info(
+            f"Converted [{result.src_file}] -> [{result.dst_file}] in {result.elapsed:.3f}s"
+        )
+        if result.issues:
+            logger.warning(
+                f"[{result.src_file}] has {result.issues} validation issues, "
+                f"rerun it alone or with --strict for details"
+            )
+    else:
+        logger.error(f"Failed to convert [{result.src_file}]: {result.error}")
+
+
+def watch(
+    src_dir: Path,
+    dst_dir: Path,
+    password: str,
+    workers: int,
+    compression_level: int,
+    strict: bool,
+):
+    """Convert backups dropped into 'src_dir' until interrupted"""
+    try:
+        watcher = Watcher(
+            src_dir,
+            dst_dir,
+            password,
+            workers,
+            compression_level,
+            strict,
+            on_result=log_result,
+        )
+    except Exception as exc:
+        logger.error(f"{exc}")
+        return
+
+    def shutdown(signum, frame):
+        logger.info("Shutting down, waiting for running conversions...")
+        watcher.stop()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    logger.info(f"Watching [{src_dir}] for .2fas files, writing to [{dst_dir}]")
+    try:
+        watcher.run()
+    except Exception as exc:
+        logger.error(f"An error is occurred while watching [{src_dir}]: {exc}")
+        return
+    logger.info("Watcher stopped.")
+
+
 if __name__ == "__main__":
     main()
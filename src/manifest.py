@@ -0,0 +1,127 @@
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from pathlib import Path
+
+from src.crypto import ITERATIONS, derive_key
+
+MANIFEST_NAME = ".twofas2raivo-manifest.json"
+MANIFEST_VERSION = 2
+HASH_CHUNK_SIZE = 1024 * 1024
+# Coarsest common mtime resolution (FAT); newer mtimes cannot be trusted
+MTIME_RESOLUTION_NS = 2_000_000_000
+
+
+def file_digest(file_path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's content"""
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _stat_signature(file_path: Path) -> list:
+    """[size, mtime, time of the stat], all in nanoseconds but the size"""
+    st = file_path.stat()
+    return [st.st_size, st.st_mtime_ns, time.time_ns()]
+
+
+def _is_ambiguous(signature: list) -> bool:
+    """Check whether a file could change again without its stat changing.
+
+    A file modified within MTIME_RESOLUTION_NS of the stat may be written to
+    again and keep the same size and mtime.
+    """
+    _, mtime_ns, checked_ns = signature
+    return mtime_ns >= checked_ns - MTIME_RESOLUTION_NS
+
+
+class Manifest:
+    """Record of converted sources, used to skip inputs that did not change.
+
+    Each source is indexed by its resolved path and stores the content hash of
+    the source and of the output it produced, plus a digest of the conversion
+    options. Size and mtime are kept alongside so unchanged files are
+    recognised without being read; files are re-hashed when those differ, or
+    when the mtime was too close to the recording time to be trusted.
+    """
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+        self.salt = secrets.token_hex(16)
+        self.entries = {}
+        if file_path.is_file():
+            with open(file_path, "r") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.salt = data.get("salt", self.salt)
+                self.entries = data.get("entries", {})
+
+    def options_digest(self, password: str = None, **options) -> str:
+        """Digest the conversion options.
+
+        The password goes through the same PBKDF2 as the backups, so the
+        stored digest is no cheaper to test password guesses against.
+        """
+        key = bytes.fromhex(self.salt)
+        pwd = (
+            derive_key(password.encode("utf-8"), key, None, None, ITERATIONS).hex()
+            if password
+            else ""
+        )
+        payload = json.dumps({"password": pwd, **options}, sort_keys=True)
+        return hmac.new(key, payload.encode(), hashlib.sha256).hexdigest()
+
+    def _matches(self, file_path: Path, signature: list, digest: str) -> bool:
+        current = _stat_signature(file_path)
+        if current[:2] == signature[:2] and not _is_ambiguous(signature):
+            return True
+        if file_digest(file_path) != digest:
+            return False
+        # Touched or ambiguous but identical: refresh the signature to take
+        # the fast path next time
+        signature[:] = current
+        return True
+
+    def is_current(self, src_file: Path, dst_file: Path, options: str) -> bool:
+        """Check whether 'dst_file' is an up-to-date conversion of 'src_file'"""
+        entry = self.entries.get(str(src_file.resolve()))
+        if entry is None:
+            return False
+        if entry["options"] != options or entry["output"] != str(dst_file.resolve()):
+            return False
+        if not dst_file.is_file():
+            return False
+        return self._matches(
+            src_file, entry["source_stat"], entry["source_sha256"]
+        ) and self._matches(dst_file, entry["output_stat"], entry["output_sha256"])
+
+    def record(self, src_file: Path, dst_file: Path, options: str):
+        """Store the conversion of 'src_file' into 'dst_file'"""
+        self.entries[str(src_file.resolve())] = {
+            "options": options,
+            "output": str(dst_file.resolve()),
+            "source_sha256": file_digest(src_file),
+            "source_stat": _stat_signature(src_file),
+            "output_sha256": file_digest(dst_file),
+            "output_stat": _stat_signature(dst_file),
+        }
+
+    def save(self):
+        """Atomically write the manifest to disk"""
+        tmp_file = self.file_path.with_name(f"{self.file_path.name}.tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(
+                {
+                    "version": MANIFEST_VERSION,
+                    "salt": self.salt,
+                    "entries": self.entries,
+                },
+                f,
+                indent=2,
+            )
+        os.replace(tmp_file, self.file_path)
@@ -0,0 +1,101 @@
+from pathlib import Path
+from typing import Iterable, List
+
+from src.archive import COMPRESSION_LEVEL
+from src.helpers import read_2fas_file, to_raivo_file
+from src.twofas import TwofasFile
+from src.validation import ValidationReport
+
+CONFLICT_POLICIES = ("newest", "first", "last")
+
+
+def normalize_secret(secret: str | None) -> str:
+    """Normalize a base32 secret so formatting differences do not matter"""
+    return "".join((secret or "").split()).replace("-", "").upper().rstrip("=")
+
+
+def service_key(service: dict) -> tuple:
+    """Return the (issuer, account, normalized secret) identity of a service"""
+    otp = service.get("otp") or {}
+    return (
+        service.get("name"),
+        otp.get("account"),
+        normalize_secret(service.get("secret")),
+    )
+
+
+class ServiceIndex:
+    """Hash index of 2FAS services resolving duplicates with a conflict policy"""
+
+    def __init__(self, policy: str = "newest"):
+        if policy not in CONFLICT_POLICIES:
+            raise ValueError(
+                f"'policy' must be one of: {', '.join(CONFLICT_POLICIES)}."
+            )
+        self.policy = policy
+        self.total = 0
+        self._services = {}
+
+    def __len__(self) -> int:
+        return len(self._services)
+
+    @property
+    def duplicates(self) -> int:
+        return self.total - len(self._services)
+
+    def _replaces(self, service: dict, current: dict) -> bool:
+        if self.policy == "first":
+            return False
+        if self.policy == "last":
+            return True
+        return (service.get("updatedAt") or 0) > (current.get("updatedAt") or 0)
+
+    def add(self, service: dict):
+        self.total += 1
+        key = service_key(service)
+        current = self._services.get(key)
+        if current is None or self._replaces(service, current):
+            self._services[key] = service
+
+    def update(self, services: Iterable[dict]):
+        for service in services:
+            self.add(service)
+
+    def services(self) -> List[dict]:
+        """Return the kept services, in order of first appearance"""
+        return list(self._services.values())
+
+
+def merge_2fas_files(
+    src_files: List[Path],
+    dst_file: Path,
+    password: str = None,
+    policy: str = "newest",
+    compression_level: int = COMPRESSION_LEVEL,
+    report: ValidationReport | None = None,
+    strict: bool = False,
+) -> ServiceIndex:
+    """Merge many .2fas files into a single deduplicated Raivo export.
+
+    Files are loaded one at a time, so only the unique services are kept in
+    memory. Returns the index, which reports the totals.
+    """
+
+    if len(src_files) == 0:
+        raise ValueError("'src_files' must contain at least one Path object.")
+
+    index = ServiceIndex(policy)
+    for src_file in src_files:
+        index.update(read_2fas_file(src_file, password).services)
+
+    merged = TwofasFile(file_path=None, services=index.services())
+    to_raivo_file(
+        merged,
+        dst_file,
+        password,
+        compression_level=compression_level,
+        report=report,
+        strict=strict,
+    ).save()
+
+    return index
@@ -0,0 +1,95 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class Metrics:
+    """Per-stage wall time, CPU time, peak memory and byte counts"""
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.stages = []
+        self._stack = []
+
+    def _traced(self) -> tuple:
+        if self.trace_memory and tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()
+        return 0, 0
+
+    @contextmanager
+    def stage(self, name: str):
+        """Record the enclosed block as 'name', yielding a dict for byte counts"""
+        counters = {}
+        if self._stack:
+            # Keep the parent's peak before resetting it for this stage
+            parent = self._stack[-1]
+            parent["peak"] = max(parent["peak"], self._traced()[1])
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        current, _ = self._traced()
+        frame = {"peak": current}
+        self._stack.append(frame)
+        record = {"stage": name, "depth": len(self._stack) - 1}
+        self.stages.append(record)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield counters
+        finally:
+            record["wall_seconds"] = time.perf_counter() - wall
+            record["cpu_seconds"] = time.process_time() - cpu
+            self._stack.pop()
+            peak = max(frame["peak"], self._traced()[1])
+            if self.trace_memory:
+                record["peak_memory_bytes"] = max(peak - current, 0)
+            record.update(counters)
+            if self._stack:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+
+    def report(self) -> dict:
+        return {
+            "total_wall_seconds": sum(
+                s.get("wall_seconds", 0.0) for s in self.stages if s["depth"] == 0
+            ),
+            "stages": self.stages,
+        }
+
+
+class _NullStage:
+    """Stand-in for Metrics.stage when no collector is active"""
+
+    def __enter__(self) -> dict:
+        return {}
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+_active: ContextVar[Metrics | None] = ContextVar("metrics", default=None)
+
+
+def stage(name: str):
+    """Time a block with the active collector, or do nothing if there is none"""
+    metrics = _active.get()
+    if metrics is None:
+        return _NULL_STAGE
+    return metrics.stage(name)
+
+
+@contextmanager
+def collect(metrics: Metrics | None):
+    """Make 'metrics' the active collector for the enclosed block"""
+    if metrics is None:
+        yield None
+        return
+    started = metrics.trace_memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    token = _active.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _active.reset(token)
+        if started:
+            tracemalloc.stop()
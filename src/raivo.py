@@ -1,53 +1,99 @@
+import io
 import json
 import os
-import tempfile
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from pathlib import Path
+from typing import BinaryIO
 
-import pyminizip
+from src.archive import (
+    COMPRESSION_LEVEL,
+    EncryptedZipWriter,
+    compress_data,
+    use_pyminizip,
+)
+from src.camel_case import CamelCaseMixin, camel_case_keys
+from src.metrics import stage
+
+RAIVO_EXPORT_NAME = "raivo-otp-export.json"
 
 
 @dataclass
-class RaivoFile:
-    file_path: Path
+class RaivoFile(CamelCaseMixin):
+    file_path: Path | None
     password: str | None
     services: list
+    compression_level: int
 
-    def __init__(self, file_path: Path, password: str = None, services: list = []):
+    def __init__(
+        self,
+        file_path: Path | None,
+        password: str = None,
+        services: list | None = None,
+        compression_level: int = COMPRESSION_LEVEL,
+    ):
         self.file_path = (
-            self.file_path.joinpath("raivo-otp-export.zip")
-            if file_path.is_dir()
+            file_path.joinpath("raivo-otp-export.zip")
+            if file_path is not None and file_path.is_dir()
             else file_path
         )
         self.password = password
-        self.services = services
-
-    def to_camel_case(self, input_str: str) -> str:
-        """Convert snake_case string to camelCase"""
-        components = input_str.split("_")
-        return components[0] + "".join(x.title() for x in components[1:])
-
-    def asdict(self) -> dict:
-        return {
-            self.to_camel_case(field.name): getattr(self, field.name)
-            for field in self.__dataclass_fields__.values()
-        }
-
-    def save(self):
-        """Write object content to file"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            if len(self.file_path.suffix) == 0 or self.file_path.suffix != ".zip":
-                self.file_path = self.file_path.with_suffix(".zip")
-            json_file = Path(temp_dir).joinpath("raivo-otp-export.json")
-            with open(json_file, "w") as f:
-                f.write(json.dumps(self.services))
-            pyminizip.compress(
-                str(json_file), None, str(self.file_path), self.password, 5
+        self.services = [] if services is None else services
+        self.compression_level = compression_level
+
+    def _serialize(self) -> bytes:
+        with stage("serialize") as counters:
+            payload = json.dumps(self.services).encode("utf-8")
+            counters["bytes_out"] = len(payload)
+        return payload
+
+    def write(self, fileobj: BinaryIO):
+        """Write the password-protected Raivo zip to a binary file-like object"""
+        payload = self._serialize()
+        with stage("zip") as counters:
+            archive = EncryptedZipWriter(fileobj, self.password, self.compression_level)
+            with archive:
+                archive.writestr(RAIVO_EXPORT_NAME, payload)
+            counters["bytes_in"] = len(payload)
+            counters["bytes_out"] = archive._offset
+
+    def to_bytes(self) -> bytes:
+        """Return the password-protected Raivo zip as bytes"""
+        buffer = io.BytesIO()
+        self.write(buffer)
+        return buffer.getvalue()
+
+    def save(self, target: Path | BinaryIO | None = None):
+        """Write object content to 'target', defaulting to 'file_path'.
+
+        Files are zipped in memory unless the pyminizip backend is selected.
+        """
+        if target is not None and not isinstance(target, (str, Path)):
+            self.write(target)
+            return
+        if target is not None:
+            self.file_path = Path(target)
+        if self.file_path is None:
+            raise ValueError("No 'file_path' or 'target' to save to.")
+        if len(self.file_path.suffix) == 0 or self.file_path.suffix != ".zip":
+            self.file_path = self.file_path.with_suffix(".zip")
+        if not use_pyminizip(self.compression_level):
+            with open(self.file_path, "wb") as f:
+                self.write(f)
+            return
+        payload = self._serialize()
+        with stage("zip") as counters:
+            counters["bytes_in"] = len(payload)
+            counters["bytes_out"] = compress_data(
+                self.file_path,
+                RAIVO_EXPORT_NAME,
+                payload,
+                self.password,
+                self.compression_level,
             )
 
 
-@dataclass
-class RaivoEntry:
+@dataclass(slots=True)
+class RaivoEntry(CamelCaseMixin):
     secret: str
     account: str
     issuer: str
@@ -85,20 +131,59 @@ class RaivoEntry:
         self.icon_type = icon_type
         self.icon_value = icon_value
         self.digits = digits
-        for field in self.__dataclass_fields__:
-            value = getattr(self, field)
+        self._check_types()
+
+    def _check_types(self):
+        for name, _ in self._keys:
+            value = getattr(self, name)
             if not isinstance(value, str):
                 raise TypeError(
-                    f"{field} should be a string, but got {type(value).__name__}."
+                    f"{name} should be a string, but got {type(value).__name__}."
                 )
 
-    def to_camel_case(self, input_str: str) -> str:
-        """Convert snake_case string to camelCase"""
-        components = input_str.split("_")
-        return components[0] + "".join(x.title() for x in components[1:])
+    @classmethod
+    def from_twofas_service(cls, service: dict) -> "RaivoEntry | None":
+        """Map a 2FAS service to its Raivo entry, or None if it has no 'otp'"""
+        entries = cls.from_twofas_services([service])
+        return entries[0] if entries else None
+
+    @classmethod
+    def from_twofas_services(cls, services: list) -> list:
+        """Map many 2FAS services to Raivo entries in a single pass.
+
+        Services without an 'otp' object have nothing to map and are left
+        out; validation reports them.
+        """
+        new = cls.__new__
+        entries = []
+        append = entries.append
+        for service in services:
+            otp = service.get("otp") if isinstance(service, dict) else None
+            if not isinstance(otp, dict):
+                continue
+            entry = new(cls)
+            entry.secret = service.get("secret")
+            entry.account = otp.get("account")
+            entry.issuer = service.get("name")
+            entry.algorithm = otp.get("algorithm")
+            entry.timer = str(otp.get("period"))
+            entry.counter = str(otp.get("counter"))
+            entry.kind = otp.get("tokenType")
+            entry.pinned = "false"
+            entry.icon_type = ""
+            entry.icon_value = ""
+            entry.digits = str(otp.get("digits"))
+            if not (
+                type(entry.secret) is str
+                and type(entry.account) is str
+                and type(entry.issuer) is str
+                and type(entry.algorithm) is str
+                and type(entry.kind) is str
+            ):
+                entry._check_types()
+            append(entry)
+        return entries
+
 
-    def asdict(self) -> dict:
-        return {
-            self.to_camel_case(field.name): getattr(self, field.name)
-            for field in self.__dataclass_fields__.values()
-        }
+RaivoFile._keys = camel_case_keys(RaivoFile)
+RaivoEntry._keys = camel_case_keys(RaivoEntry)
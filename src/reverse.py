@@ -0,0 +1,81 @@
+import json
+import os
+from pathlib import Path
+from typing import List
+
+from src.metrics import stage
+from src.shard import split_services
+from src.twofas import TwofasEntry, TwofasFile
+from src.verify import read_raivo_entries
+
+TWOFAS_EXPORT_NAME = "2fas-backup.2fas"
+
+
+def read_raivo_batch(src_files: List[Path], password: str = None) -> List[dict]:
+    """Read a batch of Raivo exports and map their entries to 2FAS services"""
+    services = []
+    for src_file in src_files:
+        services.extend(
+            TwofasEntry.from_raivo_entries(read_raivo_entries(src_file, password))
+        )
+    return services
+
+
+def read_raivo_files(
+    src_files: List[Path], password: str = None, max_workers: int = None
+) -> List[dict]:
+    """Map the entries of many Raivo exports to 2FAS services, in input order.
+
+    The files are split into one contiguous batch per worker and the batches
+    are read in parallel, since unzipping the ZipCrypto archives dominates.
+    """
+    if len(src_files) == 0:
+        return []
+    workers = min(max_workers or os.cpu_count() or 1, len(src_files))
+    batches = split_services(list(src_files), workers)
+    if len(batches) == 1:
+        return read_raivo_batch(batches[0], password)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    services = []
+    with ProcessPoolExecutor(max_workers=len(batches)) as executor:
+        for batch in executor.map(read_raivo_batch, batches, [password] * len(batches)):
+            services.extend(batch)
+    return services
+
+
+def reverse_raivo_to_2fas(
+    src_files: List[Path],
+    dst_file: Path,
+    password: str,
+    max_workers: int = None,
+) -> TwofasFile:
+    """Convert Raivo exports back into a single encrypted .2fas backup.
+
+    Every export is protected by 'password', which also encrypts the
+    'servicesEncrypted' field of 'dst_file'. The services are numbered in
+    input order and encrypted in one pass, so the key is derived once.
+    """
+    if not isinstance(dst_file, Path):
+        raise TypeError("'dst_file' is not a valid Path object.")
+    if password in [None, ""]:
+        raise ValueError("Password is not a valid string.")
+
+    with stage("read_raivo") as counters:
+        services = read_raivo_files(src_files, password, max_workers)
+        counters["entries"] = len(services)
+    for position, service in enumerate(services):
+        service["order"] = {"position": position}
+
+    dst = TwofasFile(file_path=dst_file, services=services, password=password)
+    dst.encrypt()
+
+    with stage("save") as counters:
+        tmp_file = dst_file.with_name(f"{dst_file.name}.tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(dst.backup(), f)
+        os.replace(tmp_file, dst_file)
+        counters["bytes_out"] = dst_file.stat().st_size
+
+    return dst
@@ -0,0 +1,171 @@
+import json
+import mmap
+import os
+import re
+from dataclasses import asdict, dataclass
+from datetime import datetime as dt
+from pathlib import Path
+from typing import Dict, List
+
+SCAN_CACHE_NAME = ".twofas2raivo-scan.json"
+SCAN_CACHE_VERSION = 1
+MMAP_THRESHOLD = 1024 * 1024
+
+# Top-level keys of a .2fas file; none of them appear inside a service
+_SCHEMA_VERSION = re.compile(rb'"schemaVersion"\s*:\s*(\d+)')
+_APP_ORIGIN = re.compile(rb'"appOrigin"\s*:\s*"([^"\\]*)"')
+_SERVICES_ENCRYPTED = re.compile(rb'"servicesEncrypted"\s*:\s*(null|")')
+# Every service has exactly one "secret" key. A quote inside a JSON string is
+# always escaped, so '"secret"' followed by a colon can only be a key
+_SECRET_KEY = re.compile(rb'"secret"\s*:')
+
+
+def count_services(data: bytes) -> int:
+    """Count the services of an unencrypted backup without parsing it"""
+    return len(_SECRET_KEY.findall(data))
+
+
+@dataclass(slots=True)
+class BackupInfo:
+    path: str
+    size: int
+    mtime: float
+    schema_version: int | None = None
+    app_origin: str | None = None
+    encrypted: bool | None = None
+    services: int | None = None
+
+    def asdict(self) -> dict:
+        return asdict(self)
+
+    def describe(self) -> str:
+        """One-line summary shown next to the path when picking a backup"""
+        parts = [
+            f"schema {self.schema_version}" if self.schema_version else "no schema",
+            self.app_origin or "unknown origin",
+            "encrypted" if self.encrypted else "unencrypted",
+        ]
+        if self.services is not None:
+            parts.append(f"{self.services} services")
+        parts.append(f"{self.size / 1024:.1f} KiB")
+        parts.append(dt.fromtimestamp(self.mtime).strftime("%Y-%m-%d %H:%M"))
+        return ", ".join(parts)
+
+
+def read_backup_info(path: str, size: int, mtime: float) -> BackupInfo:
+    """Read the header fields of a .2fas file without parsing or decrypting it.
+
+    The top-level fields are matched directly in the raw bytes. Files larger
+    than MMAP_THRESHOLD are memory-mapped instead of read. The service count is
+    only reported for unencrypted backups.
+    """
+    info = BackupInfo(path=path, size=size, mtime=mtime)
+    if size == 0:
+        return info
+    with open(path, "rb") as f:
+        if size > MMAP_THRESHOLD:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = f.read()
+    try:
+        if match := _SCHEMA_VERSION.search(data):
+            info.schema_version = int(match.group(1))
+        if match := _APP_ORIGIN.search(data):
+            info.app_origin = match.group(1).decode("utf-8", "replace")
+        match = _SERVICES_ENCRYPTED.search(data)
+        info.encrypted = match is not None and match.group(1) == b'"'
+        if not info.encrypted:
+            info.services = count_services(data)
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+    return info
+
+
+class Scanner:
+    """Recursive .2fas scanner caching each file's header by (inode, mtime).
+
+    Files whose device, inode, size and mtime did not change since the last
+    scan are not opened again. The cache can be persisted to 'cache_file'.
+    """
+
+    def __init__(self, cache_file: Path | None = None):
+        self.cache_file = cache_file
+        self.hits = 0
+        self.misses = 0
+        # path -> [dev, inode, size, mtime_ns, info]
+        self._cache: Dict[str, list] = {}
+        if cache_file is not None and cache_file.is_file():
+            with open(cache_file, "r") as f:
+                data = json.load(f)
+            if data.get("version") == SCAN_CACHE_VERSION:
+                for path, (*signature, info) in data.get("entries", {}).items():
+                    self._cache[path] = [*signature, BackupInfo(**info)]
+
+    def _info(self, entry: os.DirEntry) -> BackupInfo:
+        st = entry.stat()
+        signature = [st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns]
+        cached = self._cache.get(entry.path)
+        if cached is not None and cached[:4] == signature:
+            self.hits += 1
+            return cached[4]
+        self.misses += 1
+        info = read_backup_info(entry.path, st.st_size, st.st_mtime)
+        self._cache[entry.path] = [*signature, info]
+        return info
+
+    def scan(self, root: Path, recursive: bool = True) -> List[BackupInfo]:
+        """Describe every .2fas file under 'root', sorted by path"""
+        if not isinstance(root, Path):
+            raise TypeError("'root' is not a valid Path object.")
+        if not root.is_dir():
+            raise ValueError("'root' is not a valid directory.")
+
+        found, seen = [], set()
+        pending = [str(root)]
+        while pending:
+            try:
+                entries = os.scandir(pending.pop())
+            except (PermissionError, FileNotFoundError):
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                pending.append(entry.path)
+                        elif entry.name.endswith(".2fas") and entry.is_file():
+                            found.append(self._info(entry))
+                            seen.add(entry.path)
+                    except OSError:
+                        continue
+        # Forget files that disappeared from the scanned tree
+        prefix = os.path.join(str(root), "")
+        for path in [p for p in self._cache if p.startswith(prefix)]:
+            if path not in seen and (recursive or os.path.dirname(path) == str(root)):
+                del self._cache[path]
+        found.sort(key=lambda info: info.path)
+        return found
+
+    def save(self):
+        """Atomically write the cache to 'cache_file'"""
+        if self.cache_file is None:
+            return
+        tmp_file = self.cache_file.with_name(f"{self.cache_file.name}.tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(
+                {
+                    "version": SCAN_CACHE_VERSION,
+                    "entries": {
+                        path: [*signature, info.asdict()]
+                        for path, (*signature, info) in self._cache.items()
+                    },
+                },
+                f,
+            )
+        os.replace(tmp_file, self.cache_file)
+
+
+def scan_backups(root: Path, recursive: bool = True) -> List[BackupInfo]:
+    """Describe every .2fas file under 'root' without a persistent cache"""
+    return Scanner().scan(root, recursive)
@@ -0,0 +1,291 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable
+
+from loguru import logger
+
+from src.helpers import convert_2fas_bytes
+
+HOST = "127.0.0.1"
+PORT = 8080
+MAX_BODY_SIZE = 64 * 1024 * 1024
+MAX_HEADER_COUNT = 100
+# Headers whose value is text sent as UTF-8 rather than ISO-8859-1
+UTF8_HEADERS = frozenset(("x-password",))
+LATENCY_WINDOW = 1024
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ServerMetrics:
+    """Request counters and latency percentiles over a sliding window"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.requests = 0
+        self.converted = 0
+        self.failed = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.latencies.append(seconds)
+
+    def report(self, in_flight: int) -> dict:
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float) -> float | None:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            "requests": self.requests,
+            "converted": self.converted,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "in_flight": in_flight,
+            "latency_seconds": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": latencies[-1] if latencies else None,
+            },
+        }
+
+
+class ConversionServer:
+    """Minimal HTTP/1.1 server converting .2fas backups posted to /convert.
+
+    Conversions run on 'executor' so the event loop only does I/O. At most
+    'max_concurrency' jobs run at once and 'max_queue' more may wait; further
+    requests are rejected with 503 so clients back off instead of piling up.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        max_concurrency: int = None,
+        max_queue: int = None,
+        max_body_size: int = MAX_BODY_SIZE,
+        convert: Callable[[bytes, str | None], bytes] = convert_2fas_bytes,
+    ):
+        self.executor = executor
+        self.max_concurrency = max_concurrency or os.cpu_count() or 1
+        self.max_queue = self.max_concurrency if max_queue is None else max_queue
+        self.max_body_size = max_body_size
+        self.convert = convert
+        self.metrics = ServerMetrics()
+        self._in_flight = 0
+        self._semaphore = None
+
+    async def start(self, host: str = HOST, port: int = PORT, unix_socket: str = None):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if unix_socket:
+            return await asyncio.start_unix_server(self.handle, path=unix_socket)
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> tuple:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        try:
+            method, path, _ = request_line.split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line.")
+        headers = {}
+        while True:
+            line = (await reader.readline()).strip()
+            if not line:
+                break
+            if len(headers) >= MAX_HEADER_COUNT:
+                raise HTTPError(400, "Too many headers.")
+            raw_name, _, raw_value = line.partition(b":")
+            name = raw_name.decode("latin-1").strip().lower()
+            try:
+                value = raw_value.decode(
+                    "utf-8" if name in UTF8_HEADERS else "latin-1"
+                ).strip()
+            except UnicodeDecodeError:
+                raise HTTPError(400, f"Header '{name}' must be UTF-8.")
+            headers[name] = value
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length.")
+        if length < 0 or length > self.max_body_size:
+            raise HTTPError(413, f"Body must be at most {self.max_body_size} bytes.")
+        body = await reader.readexactly(length) if length else b""
+        return method, path, headers, body
+
+    async def _write_response(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        body: bytes,
+        content_type: str,
+        extra_headers: dict = None,
+    ):
+        headers = {
+            "Content-Type": content_type,
+            "Content-Length": str(len(body)),
+            "Connection": "close",
+            **(extra_headers or {}),
+        }
+        head = f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n" + "".join(
+            f"{name}: {value}\r\n" for name, value in headers.items()
+        )
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+        await writer.drain()
+
+    async def _json_response(self, writer, status: int, payload: dict, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        await self._write_response(writer, status, body, "application/json", headers)
+
+    async def _convert(self, body: bytes, password: str | None) -> bytes:
+        if self._in_flight >= self.max_concurrency + self.max_queue:
+            self.metrics.rejected += 1
+            raise HTTPError(503, "Server is busy, retry later.")
+        self._in_flight += 1
+        try:
+            async with self._semaphore:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self.executor, self.convert, body, password
+                )
+        finally:
+            self._in_flight -= 1
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        start = time.perf_counter()
+        try:
+            method, path, headers, body = await self._read_request(reader)
+            if path == "/metrics":
+                if method != "GET":
+                    raise HTTPError(405, "Use GET.")
+                await self._json_response(
+                    writer, 200, self.metrics.report(self._in_flight)
+                )
+                return
+            if path != "/convert":
+                raise HTTPError(404, "Not found.")
+            if method != "POST":
+                raise HTTPError(405, "Use POST.")
+
+            self.metrics.requests += 1
+            try:
+                result = await self._convert(body, headers.get("x-password") or None)
+            except HTTPError:
+                raise
+            except Exception as exc:
+                self.metrics.failed += 1
+                raise HTTPError(422, str(exc))
+            self.metrics.converted += 1
+            latency = time.perf_counter() - start
+            self.metrics.observe(latency)
+            await self._write_response(
+                writer,
+                200,
+                result,
+                "application/zip",
+                {"X-Conversion-Seconds": f"{latency:.6f}"},
+            )
+        except HTTPError as exc:
+            extra = {"Retry-After": "1"} if exc.status == 503 else None
+            await self._json_response(writer, exc.status, {"error": str(exc)}, extra)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(args: argparse.Namespace):
+    executor = (
+        ThreadPoolExecutor(max_workers=args.workers)
+        if args.executor == "thread"
+        else ProcessPoolExecutor(max_workers=args.workers)
+    )
+    server = ConversionServer(
+        executor,
+        max_concurrency=args.max_concurrency,
+        max_queue=args.max_queue,
+        max_body_size=args.max_body_size,
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    try:
+        listener = await server.start(args.host, args.port, args.unix_socket)
+        address = args.unix_socket or f"{args.host}:{args.port}"
+        logger.info(f"Listening on [{address}]")
+        async with listener:
+            await stop.wait()
+        logger.info("Server stopped.")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="twofas2raivo-server",
+        description="A local HTTP service converting 2FAS backups into Raivo-compatible ones.",
+    )
+    parser.add_argument("--host", type=str, default=HOST, help="Address to bind.")
+    parser.add_argument("--port", type=int, default=PORT, help="Port to bind.")
+    parser.add_argument(
+        "--unix-socket",
+        type=str,
+        default=None,
+        help="Listen on a Unix socket instead of TCP.",
+    )
+    parser.add_argument(
+        "--executor",
+        choices=["process", "thread"],
+        default="process",
+        help="Pool running the conversions (default: process).",
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=None, help="Size of the worker pool."
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=None,
+        help="Conversions running at once (default: CPU count).",
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=None,
+        help="Conversions waiting before requests get 503 (default: max concurrency).",
+    )
+    parser.add_argument(
+        "--max-body-size",
+        type=int,
+        default=MAX_BODY_SIZE,
+        help="Largest accepted backup in bytes.",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
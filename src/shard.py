@@ -0,0 +1,134 @@
+import json
+import os
+from pathlib import Path
+from typing import List
+
+from src.archive import COMPRESSION_LEVEL
+from src.helpers import init_worker, read_2fas_file, to_raivo_file, worker_backends
+from src.manifest import file_digest
+from src.metrics import stage
+from src.raivo import RaivoFile
+from src.validation import ValidationReport
+
+SHARD_MANIFEST_VERSION = 1
+
+
+def split_services(services: list, shards: int) -> List[list]:
+    """Split 'services' into at most 'shards' contiguous, balanced chunks"""
+    if shards <= 0:
+        raise ValueError("'shards' must be > 0.")
+    shards = min(shards, len(services)) or 1
+    size, extra = divmod(len(services), shards)
+    chunks, start = [], 0
+    for index in range(shards):
+        end = start + size + (1 if index < extra else 0)
+        chunks.append(services[start:end])
+        start = end
+    return chunks
+
+
+def get_shard_file(dst_file: Path, index: int, count: int) -> Path:
+    """Build the path of shard 'index' (0-based) out of 'count'"""
+    return dst_file.with_name(f"{dst_file.stem}.part{index + 1:03d}-of-{count:03d}.zip")
+
+
+def get_shard_manifest_file(dst_file: Path) -> Path:
+    """Build the path of the manifest tying the shards of 'dst_file' together"""
+    return dst_file.with_name(f"{dst_file.stem}.shards.json")
+
+
+def write_shard(
+    shard_file: Path, password: str, services: list, compression_level: int
+) -> dict:
+    """Write one shard and describe it for the manifest"""
+    RaivoFile(shard_file, password, services, compression_level).save()
+    return {
+        "file": shard_file.name,
+        "services": len(services),
+        "size": shard_file.stat().st_size,
+        "sha256": file_digest(shard_file),
+    }
+
+
+def save_shards(
+    services: list,
+    dst_file: Path,
+    password: str = None,
+    shards: int = 1,
+    compression_level: int = COMPRESSION_LEVEL,
+    max_workers: int = None,
+) -> dict:
+    """Write 'services' as password-protected Raivo shards plus a manifest.
+
+    Each shard is a complete Raivo export holding a contiguous slice of the
+    services, so any of them can be imported on its own. Shards are
+    compressed and encrypted in parallel on a process pool. Returns the
+    manifest, which is also saved next to the shards.
+    """
+
+    if not isinstance(dst_file, Path):
+        raise TypeError("'dst_file' is not a valid Path object.")
+
+    dst_file = dst_file.with_suffix(".zip")
+    chunks = split_services(services, shards)
+    shard_files = [
+        get_shard_file(dst_file, index, len(chunks)) for index in range(len(chunks))
+    ]
+    jobs = [
+        (shard_file, password, chunk, compression_level)
+        for shard_file, chunk in zip(shard_files, chunks)
+    ]
+
+    with stage("shards") as counters:
+        workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+        if workers == 1:
+            described = [write_shard(*job) for job in jobs]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=init_worker,
+                initargs=worker_backends(),
+            ) as executor:
+                described = list(executor.map(write_shard, *zip(*jobs)))
+        counters["shards"] = len(described)
+        counters["bytes_out"] = sum(shard["size"] for shard in described)
+
+    manifest = {
+        "version": SHARD_MANIFEST_VERSION,
+        "services": len(services),
+        "compression_level": compression_level,
+        "shards": described,
+    }
+    manifest_file = get_shard_manifest_file(dst_file)
+    tmp_file = manifest_file.with_name(f"{manifest_file.name}.tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_file, manifest_file)
+
+    return manifest
+
+
+def shard_2fas_to_raivo(
+    src_file: Path,
+    dst_file: Path,
+    password: str = None,
+    shards: int = 1,
+    compression_level: int = COMPRESSION_LEVEL,
+    max_workers: int = None,
+    report: ValidationReport | None = None,
+    strict: bool = False,
+) -> dict:
+    """Convert a .2fas file to 'shards' Raivo exports tied by a manifest"""
+
+    dst = to_raivo_file(
+        read_2fas_file(src_file, password),
+        None,
+        password,
+        report=report,
+        strict=strict,
+    )
+    return save_shards(
+        dst.services, dst_file, password, shards, compression_level, max_workers
+    )
@@ -0,0 +1,115 @@
+import json
+from typing import Any, Iterator, TextIO
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+
+
+class JSONStream:
+    """Incremental reader for JSON documents too large to load at once"""
+
+    def __init__(self, fp: TextIO, chunk_size: int = CHUNK_SIZE):
+        if chunk_size <= 0:
+            raise ValueError("'chunk_size' must be > 0.")
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, size: int = None) -> bool:
+        """Drop the consumed prefix and append the next chunk to the buffer"""
+        if self.eof:
+            return False
+        chunk = self.fp.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character, or '' at end of input"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def next_char(self) -> str:
+        """Consume and return the next non-whitespace character"""
+        char = self.peek()
+        self.pos += len(char)
+        return char
+
+    def expect(self, char: str):
+        found = self.next_char()
+        if found != char:
+            raise ValueError(
+                f"Invalid JSON: expected '{char}' but got '{found or 'EOF'}'."
+            )
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value"""
+        self.peek()
+        grow = self.chunk_size
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self.buffer, self.pos)
+                # A value ending at the buffer boundary may be a truncated number
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow reads geometrically so large values are not re-parsed many times
+            self._fill(grow)
+            grow = max(grow, len(self.buffer))
+
+
+def iter_array_items(
+    fp: TextIO, key: str, fields: dict = None, chunk_size: int = CHUNK_SIZE
+) -> Iterator[Any]:
+    """Yield the items of the top-level array 'key' one at a time.
+
+    Other top-level values are decoded and, when 'fields' is given, stored in it.
+    """
+    stream = JSONStream(fp, chunk_size)
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        name = stream.value()
+        if not isinstance(name, str):
+            raise ValueError("Invalid JSON: object keys must be strings.")
+        stream.expect(":")
+        if name == key:
+            stream.expect("[")
+            if stream.peek() == "]":
+                stream.next_char()
+            else:
+                while True:
+                    yield stream.value()
+                    separator = stream.next_char()
+                    if separator == "]":
+                        break
+                    if separator != ",":
+                        raise ValueError(
+                            f"Invalid JSON: unexpected '{separator or 'EOF'}' in '{key}'."
+                        )
+        else:
+            value = stream.value()
+            if fields is not None:
+                fields[name] = value
+        separator = stream.next_char()
+        if separator == "}":
+            return
+        if separator != ",":
+            raise ValueError(
+                f"Invalid JSON: unexpected '{separator or 'EOF'}' in object."
+            )
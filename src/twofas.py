@@ -1,18 +1,49 @@
-import ast
 import base64
+import binascii
+import json
+import os
 from dataclasses import dataclass
 from datetime import datetime as dt
 from pathlib import Path
 
-from src.crypto import decrypt_ciphertext
+from src.crypto import (
+    KeyCache,
+    decrypt_ciphertext,
+    encrypt_ciphertext,
+    key_cache,
+    wipe,
+)
+from src.camel_case import CamelCaseMixin, camel_case_keys
+from src.metrics import stage
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 SERVICES_ENCRYPTED_LENGTH = 3
 AUTH_TAG_LENGTH = 16
+SALT_LENGTH = 32
+IV_LENGTH = 12
+
+
+def decode_services(plain_text: bytes) -> list | dict:
+    """Decode decrypted services JSON, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(plain_text)
+    return json.loads(plain_text)
+
+
+def encode_services(services: list) -> bytes:
+    """Encode services to JSON, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(services)
+    return json.dumps(services, ensure_ascii=False, separators=(",", ":")).encode()
 
 
 @dataclass
-class TwofasFile:
-    file_path: Path
+class TwofasFile(CamelCaseMixin):
+    file_path: Path | None
     services_encrypted: str | None
     services: list
     app_version_code: int
@@ -25,39 +56,28 @@ class TwofasFile:
 
     def __init__(
         self,
-        file_path: Path,
+        file_path: Path | None,
         services_encrypted: str | None = None,
-        services: list = [],
+        services: list | None = None,
         app_version_code: int = 50309,
         app_version_name: str = "5.3.9",
         app_origin: str = "ios",
         schema_version: int = 4,
-        groups: list = [],
+        groups: list | None = None,
         reference: str | None = None,
         password: str | None = None,
     ):
         self.file_path = file_path
         self.services_encrypted = services_encrypted
-        self.services = services
+        self.services = [] if services is None else services
         self.app_version_code = app_version_code
         self.app_version_name = app_version_name
         self.app_origin = app_origin
         self.schema_version = schema_version
-        self.groups = groups
+        self.groups = [] if groups is None else groups
         self.reference = reference
         self.password = password
 
-    def to_camel_case(self, input_str: str) -> str:
-        """Convert snake_case string to camelCase"""
-        components = input_str.split("_")
-        return components[0] + "".join(x.title() for x in components[1:])
-
-    def asdict(self) -> dict:
-        return {
-            self.to_camel_case(field.name): getattr(self, field.name)
-            for field in self.__dataclass_fields__.values()
-        }
-
     @property
     def encrypted(self) -> bool:
         return self._is_file_encrypted()
@@ -76,24 +96,60 @@ class TwofasFile:
             )
         return True
 
-    def decrypt(self) -> bool:
+    def decrypt(self, key_cache: KeyCache | None = key_cache) -> bool:
         if self.password in [None, ""]:
             raise ValueError(f"Password is not a valid string.")
         if not self.encrypted:
             return False
 
-        cipher_text_with_auth_tag, salt, iv = [
-            base64.b64decode(x) for x in self.services_encrypted.split(":")
-        ]
+        with stage("decrypt"):
+            return self._decrypt(key_cache, self.services_encrypted.split(":"))
+
+    def decrypt_fields(
+        self, fields: list, key_cache: KeyCache | None = key_cache
+    ) -> bool:
+        """Decrypt services from the base64 fields of 'servicesEncrypted'.
+
+        'fields' may be any ASCII buffers, e.g. views over a memory-mapped
+        backup, so the encoded blob is never copied into a str.
+        """
+        if self.password in [None, ""]:
+            raise ValueError(f"Password is not a valid string.")
+        if len(fields) != SERVICES_ENCRYPTED_LENGTH:
+            raise ValueError(
+                f"'services_encrypted' is invalid. Length must be: {SERVICES_ENCRYPTED_LENGTH}"
+            )
+
+        with stage("decrypt"):
+            return self._decrypt(key_cache, fields)
+
+    def _decrypt(self, key_cache: KeyCache | None, fields: list) -> bool:
+        with stage("base64") as counters:
+            cipher_text_with_auth_tag, salt, iv = [
+                binascii.a2b_base64(x) for x in fields
+            ]
+            counters["bytes_out"] = len(cipher_text_with_auth_tag)
         if len(cipher_text_with_auth_tag) <= AUTH_TAG_LENGTH:
             raise ValueError(
                 f"Cipher text with authentication tag length must be >= {AUTH_TAG_LENGTH}"
             )
-        cipher_text = cipher_text_with_auth_tag[:-AUTH_TAG_LENGTH]
-        auth_tag = cipher_text_with_auth_tag[-AUTH_TAG_LENGTH:]
-        pwd = str(self.password).encode()
-        plain_text, _ = decrypt_ciphertext(cipher_text, pwd, salt, iv, auth_tag)
-        tmp = ast.literal_eval(plain_text.decode("utf-8").replace("\\", ""))
+        # Views instead of slices: the cipher text is not copied again
+        view = memoryview(cipher_text_with_auth_tag)
+        pwd, plain_text = bytearray(str(self.password), "utf-8"), None
+        try:
+            plain_text, _ = decrypt_ciphertext(
+                view[:-AUTH_TAG_LENGTH],
+                pwd,
+                salt,
+                iv,
+                bytes(view[-AUTH_TAG_LENGTH:]),
+                key_cache,
+            )
+            with stage("decode") as counters:
+                tmp = decode_services(plain_text)
+                counters["bytes_in"] = len(plain_text)
+        finally:
+            wipe(pwd, plain_text)
         # If there is only one service
         if isinstance(tmp, dict):
             self.services.append(tmp)
@@ -102,9 +158,55 @@ class TwofasFile:
         self.services_encrypted = None
         return True
 
+    def encrypt(self, key_cache: KeyCache | None = None) -> bool:
+        """Replace 'services' with 'services_encrypted', the inverse of decrypt.
 
-@dataclass
-class TwofasEntry:
+        A fresh salt and IV are drawn for every call, so the key is derived
+        exactly once and is not cached by default.
+        """
+        if self.password in [None, ""]:
+            raise ValueError(f"Password is not a valid string.")
+        if self.encrypted:
+            return False
+
+        with stage("encrypt") as counters:
+            salt, iv = os.urandom(SALT_LENGTH), os.urandom(IV_LENGTH)
+            pwd = bytearray(str(self.password), "utf-8")
+            plain_text = bytearray(encode_services(self.services))
+            counters["bytes_in"] = len(plain_text)
+            try:
+                cipher_text, auth_tag = encrypt_ciphertext(
+                    plain_text, pwd, salt, iv, key_cache
+                )
+            finally:
+                wipe(pwd, plain_text)
+        with stage("base64"):
+            self.services_encrypted = ":".join(
+                base64.b64encode(x).decode() for x in (cipher_text + auth_tag, salt, iv)
+            )
+        self.services = []
+        return True
+
+    def backup(self) -> dict:
+        """Return the .2fas document of this file, in the 2FAS key order.
+
+        Like the encrypted backups of the 2FAS iOS app this file mimics, the
+        'reference' password check is left empty unless one was read in.
+        """
+        return {
+            "appOrigin": self.app_origin,
+            "schemaVersion": self.schema_version,
+            "servicesEncrypted": self.services_encrypted,
+            "services": self.services,
+            "appVersionName": self.app_version_name,
+            "appVersionCode": self.app_version_code,
+            "reference": self.reference or "",
+            "groups": self.groups,
+        }
+
+
+@dataclass(slots=True)
+class TwofasEntry(CamelCaseMixin):
     name: str
     secret: str
     otp: dict
@@ -138,8 +240,8 @@ class TwofasEntry:
                 "period": 30,
             }
         )
-        self.updated_at = updated_at = (
-            (int)(dt.now().microsecond()) if None else updated_at
+        self.updated_at = (
+            int(dt.now().timestamp() * 1000) if updated_at is None else updated_at
         )
         self.badge = badge if badge else {"color": "Default"}
         self.icon = (
@@ -153,13 +255,32 @@ class TwofasEntry:
         )
         self.order = order if order else {"position": 0}
 
-    def to_camel_case(self, input_str: str) -> str:
-        """Convert snake_case string to camelCase"""
-        components = input_str.split("_")
-        return components[0] + "".join(x.title() for x in components[1:])
+    @classmethod
+    def from_raivo_entry(cls, entry: dict, position: int = 0) -> "TwofasEntry":
+        """Map a Raivo entry to its 2FAS service"""
+        return cls(
+            name=entry.get("issuer"),
+            secret=entry.get("secret"),
+            otp={
+                "account": entry.get("account"),
+                "digits": int(entry.get("digits") or 6),
+                "counter": int(entry.get("counter") or 0),
+                "source": "manual",
+                "algorithm": entry.get("algorithm"),
+                "tokenType": entry.get("kind"),
+                "period": int(entry.get("timer") or 30),
+            },
+            order={"position": position},
+        )
+
+    @classmethod
+    def from_raivo_entries(cls, entries: list, start: int = 0) -> list:
+        """Map many Raivo entries to 2FAS service dicts, numbering their order"""
+        return [
+            cls.from_raivo_entry(entry, start + i).asdict()
+            for i, entry in enumerate(entries)
+        ]
 
-    def asdict(self) -> dict:
-        return {
-            self.to_camel_case(field.name): getattr(self, field.name)
-            for field in self.__dataclass_fields__.values()
-        }
+
+TwofasFile._keys = camel_case_keys(TwofasFile)
+TwofasEntry._keys = camel_case_keys(TwofasEntry)
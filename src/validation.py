@@ -0,0 +1,156 @@
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, List
+
+from src.metrics import stage
+
+RAIVO_ALGORITHMS = frozenset(("SHA1", "SHA256", "SHA512"))
+RAIVO_KINDS = frozenset(("TOTP", "HOTP"))
+RAIVO_DIGITS = frozenset((6, 7, 8))
+MAX_REPORTED_ISSUES = 20
+
+_BASE32 = re.compile(r"[A-Z2-7]+")
+# Unpadded base32 lengths that cannot come from whole bytes
+_BASE32_BAD_REMAINDERS = frozenset((1, 3, 6))
+
+
+def _as_int(value) -> int | None:
+    if type(value) is int:
+        return value
+    # isdigit() also accepts digits like "²" that int() rejects
+    if type(value) is str and value.isdecimal():
+        return int(value)
+    return None
+
+
+def is_base32(secret: str) -> bool:
+    """Check that 'secret' decodes as base32, ignoring case, spaces and padding"""
+    if _BASE32.fullmatch(secret) is None:
+        secret = "".join(secret.split()).replace("-", "").upper().rstrip("=")
+    return (
+        _BASE32.fullmatch(secret) is not None
+        and len(secret) % 8 not in _BASE32_BAD_REMAINDERS
+    )
+
+
+@dataclass(slots=True)
+class ValidationIssue:
+    index: int
+    name: str | None
+    field: str
+    message: str
+
+    def asdict(self) -> dict:
+        return {
+            "index": self.index,
+            "name": self.name,
+            "field": self.field,
+            "message": self.message,
+        }
+
+    def __str__(self) -> str:
+        return f"service #{self.index} ({self.name}): {self.field} {self.message}"
+
+
+@dataclass
+class ValidationReport:
+    """Issues found in the 2FAS services that would not map to valid Raivo entries"""
+
+    checked: int = 0
+    issues: List[ValidationIssue] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return len(self.issues) == 0
+
+    @property
+    def invalid_services(self) -> int:
+        return len({issue.index for issue in self.issues})
+
+    def check(self, service: dict):
+        """Validate one service, recording its issues"""
+        index = self.checked
+        self.checked += 1
+        if not isinstance(service, dict):
+            self._add(index, None, "service", "is not an object")
+            return
+        name = service.get("name")
+        secret = service.get("secret")
+        if type(secret) is not str or not secret:
+            self._add(index, name, "secret", "is missing")
+        elif not is_base32(secret):
+            self._add(index, name, "secret", "is not valid base32")
+
+        otp = service.get("otp")
+        if not isinstance(otp, dict):
+            self._add(index, name, "otp", "is missing")
+            return
+        if otp.get("tokenType") not in RAIVO_KINDS:
+            self._add(
+                index, name, "tokenType", f"{otp.get('tokenType')!r} is not supported"
+            )
+        if otp.get("algorithm") not in RAIVO_ALGORITHMS:
+            self._add(
+                index, name, "algorithm", f"{otp.get('algorithm')!r} is not supported"
+            )
+        if _as_int(otp.get("digits")) not in RAIVO_DIGITS:
+            self._add(index, name, "digits", f"{otp.get('digits')!r} is not 6, 7 or 8")
+        period = _as_int(otp.get("period"))
+        if period is None or period <= 0:
+            self._add(
+                index,
+                name,
+                "period",
+                f"{otp.get('period')!r} is not a positive integer",
+            )
+        counter = _as_int(otp.get("counter"))
+        if counter is None or counter < 0:
+            self._add(
+                index,
+                name,
+                "counter",
+                f"{otp.get('counter')!r} is not a non-negative integer",
+            )
+
+    def _add(self, index: int, name: str | None, field_name: str, message: str):
+        self.issues.append(ValidationIssue(index, name, field_name, message))
+
+    def asdict(self) -> dict:
+        return {
+            "checked": self.checked,
+            "invalid_services": self.invalid_services,
+            "issues": [issue.asdict() for issue in self.issues],
+        }
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.issues)} issues in {self.invalid_services} "
+            f"of {self.checked} services"
+        )
+
+
+class ValidationError(ValueError):
+    """Raised in strict mode when services would produce invalid Raivo entries"""
+
+    def __init__(self, report: ValidationReport):
+        shown = "; ".join(str(i) for i in report.issues[:MAX_REPORTED_ISSUES])
+        more = len(report.issues) - MAX_REPORTED_ISSUES
+        super().__init__(
+            f"Validation failed, {report.summary()}: {shown}"
+            + (f"; and {more} more" if more > 0 else "")
+        )
+        self.report = report
+
+
+def validate_services(
+    services: Iterable[dict], report: ValidationReport | None = None
+) -> ValidationReport:
+    """Check every service in a single pass, adding to 'report' when given"""
+    report = ValidationReport() if report is None else report
+    with stage("validate") as counters:
+        check = report.check
+        for service in services:
+            check(service)
+        counters["entries"] = report.checked
+        counters["issues"] = len(report.issues)
+    return report
@@ -0,0 +1,262 @@
+import base64
+import binascii
+import hashlib
+import io
+import json
+import time
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Iterable, List
+
+from src.metrics import stage
+from src.raivo import RAIVO_EXPORT_NAME
+
+DIGESTS = {"SHA1": "sha1", "SHA256": "sha256", "SHA512": "sha512"}
+BLOCK_SIZES = {"SHA1": 64, "SHA256": 64, "SHA512": 128}
+_IPAD = bytes(x ^ 0x36 for x in range(256))
+_OPAD = bytes(x ^ 0x5C for x in range(256))
+
+
+def decode_secret(secret: str | None) -> bytes | None:
+    """Decode a base32 secret, ignoring case, spaces and padding"""
+    if not isinstance(secret, str):
+        return None
+    secret = "".join(secret.split()).replace("-", "").upper().rstrip("=")
+    try:
+        return base64.b32decode(secret + "=" * (-len(secret) % 8))
+    except (binascii.Error, ValueError):
+        return None
+
+
+def key_schedule(secret: str | None, algorithm: str) -> tuple | None:
+    """Decode a secret into its precomputed (inner, outer) HMAC hash states"""
+    key = decode_secret(secret)
+    if not key or algorithm not in DIGESTS:
+        return None
+    name, block_size = DIGESTS[algorithm], BLOCK_SIZES[algorithm]
+    if len(key) > block_size:
+        key = hashlib.new(name, key).digest()
+    key = key.ljust(block_size, b"\0")
+    return hashlib.new(name, key.translate(_IPAD)), hashlib.new(
+        name, key.translate(_OPAD)
+    )
+
+
+class OTPGenerator:
+    """HOTP/TOTP code generator over a precomputed HMAC key schedule.
+
+    The key is padded and hashed into its inner and outer HMAC states once;
+    every code then only copies those two hash states and feeds them the
+    moving factor, instead of keying a new HMAC object each time.
+    """
+
+    __slots__ = ("kind", "digits", "period", "counter", "_inner", "_outer", "_modulo")
+
+    def __init__(self, schedule: tuple, digits: int, period: int, counter: int, kind):
+        self.kind = kind
+        self.digits = digits
+        self.period = period
+        self.counter = counter
+        self._inner, self._outer = schedule
+        self._modulo = 10**digits
+
+    def at(self, moving_factor: int) -> str:
+        """Code for an HOTP counter or a TOTP time step"""
+        inner = self._inner.copy()
+        inner.update(moving_factor.to_bytes(8, "big"))
+        outer = self._outer.copy()
+        outer.update(inner.digest())
+        digest = outer.digest()
+        offset = digest[-1] & 0x0F
+        value = int.from_bytes(digest[offset : offset + 4], "big") & 0x7FFFFFFF
+        return str(value % self._modulo).zfill(self.digits)
+
+    def codes(self, timestamps: List[int]) -> list:
+        """Codes at each timestamp; HOTP entries only depend on their counter"""
+        if self.kind == "HOTP":
+            return [self.at(self.counter)]
+        period = self.period
+        return [self.at(timestamp // period) for timestamp in timestamps]
+
+    @classmethod
+    def build(
+        cls,
+        secret: str | None,
+        algorithm,
+        digits,
+        period,
+        counter,
+        kind,
+        schedules: dict | None = None,
+    ) -> "OTPGenerator | None":
+        """Build a generator, or None if the parameters cannot produce codes.
+
+        Key schedules are looked up in and added to 'schedules' when given, so
+        a secret shared by several entries is only decoded once.
+        """
+        if kind not in ("TOTP", "HOTP"):
+            return None
+        try:
+            digits, period, counter = int(digits), int(period), int(counter)
+        except (TypeError, ValueError):
+            return None
+        if digits <= 0 or period <= 0 or counter < 0:
+            return None
+        if schedules is None:
+            schedule = key_schedule(secret, algorithm)
+        else:
+            try:
+                schedule = schedules[(secret, algorithm)]
+            except (KeyError, TypeError):
+                schedule = key_schedule(secret, algorithm)
+                if isinstance(secret, str):
+                    schedules[(secret, algorithm)] = schedule
+        if schedule is None:
+            return None
+        return cls(schedule, digits, period, counter, kind)
+
+    @classmethod
+    def from_twofas_service(
+        cls, service: dict, schedules: dict | None = None
+    ) -> "OTPGenerator | None":
+        otp = service.get("otp") or {}
+        return cls.build(
+            service.get("secret"),
+            otp.get("algorithm"),
+            otp.get("digits"),
+            otp.get("period"),
+            otp.get("counter"),
+            otp.get("tokenType"),
+            schedules,
+        )
+
+    @classmethod
+    def from_raivo_entry(
+        cls, entry: dict, schedules: dict | None = None
+    ) -> "OTPGenerator | None":
+        return cls.build(
+            entry.get("secret"),
+            entry.get("algorithm"),
+            entry.get("digits"),
+            entry.get("timer"),
+            entry.get("counter"),
+            entry.get("kind"),
+            schedules,
+        )
+
+
+@dataclass(slots=True)
+class VerificationMismatch:
+    index: int
+    name: str | None
+    reason: str
+
+    def __str__(self) -> str:
+        return f"service #{self.index} ({self.name}): {self.reason}"
+
+
+@dataclass
+class VerificationReport:
+    """Outcome of comparing the codes of 2FAS services and Raivo entries"""
+
+    checked: int = 0
+    codes: int = 0
+    unverifiable: int = 0
+    mismatches: List[VerificationMismatch] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return len(self.mismatches) == 0
+
+    def asdict(self) -> dict:
+        return {
+            "checked": self.checked,
+            "codes": self.codes,
+            "unverifiable": self.unverifiable,
+            "mismatches": [
+                {"index": m.index, "name": m.name, "reason": m.reason}
+                for m in self.mismatches
+            ],
+        }
+
+    def summary(self) -> str:
+        return (
+            f"{self.checked} services, {self.codes} codes compared, "
+            f"{len(self.mismatches)} mismatches, {self.unverifiable} unverifiable"
+        )
+
+
+def verify_services(
+    twofas_services: List[dict],
+    raivo_entries: List[dict],
+    timestamps: Iterable[int] = None,
+) -> VerificationReport:
+    """Check that every Raivo entry generates the codes of its 2FAS service.
+
+    Entries are matched by position, as conversion keeps the service order.
+    Each distinct secret is decoded and keyed once, then both sides compute
+    their own codes at every timestamp (HOTP entries at their counter). Services whose
+    parameters cannot produce codes on either side are counted as
+    unverifiable when both sides agree on it, and as mismatches otherwise.
+    """
+
+    timestamps = [int(time.time())] if timestamps is None else list(timestamps)
+    report = VerificationReport()
+    schedules = {}
+
+    with stage("verify") as counters:
+        if len(twofas_services) != len(raivo_entries):
+            report.mismatches.append(
+                VerificationMismatch(
+                    -1,
+                    None,
+                    f"{len(twofas_services)} services but "
+                    f"{len(raivo_entries)} Raivo entries",
+                )
+            )
+        for index, (service, entry) in enumerate(zip(twofas_services, raivo_entries)):
+            report.checked += 1
+            expected = OTPGenerator.from_twofas_service(service, schedules)
+            actual = OTPGenerator.from_raivo_entry(entry, schedules)
+            if expected is None or actual is None:
+                if expected is None and actual is None:
+                    report.unverifiable += 1
+                else:
+                    report.mismatches.append(
+                        VerificationMismatch(
+                            index, service.get("name"), "only one side produces codes"
+                        )
+                    )
+                continue
+            expected_codes = expected.codes(timestamps)
+            report.codes += len(expected_codes)
+            if actual.codes(timestamps) != expected_codes:
+                report.mismatches.append(
+                    VerificationMismatch(index, service.get("name"), "codes differ")
+                )
+        counters["entries"] = report.checked
+        counters["codes"] = report.codes
+
+    return report
+
+
+def read_raivo_entries(src: Path | BinaryIO | bytes, password: str = None) -> list:
+    """Load the entries of a Raivo export zip"""
+    if isinstance(src, (bytes, bytearray)):
+        src = io.BytesIO(src)
+    with zipfile.ZipFile(src) as archive:
+        pwd = password.encode("utf-8") if password else None
+        return json.loads(archive.read(RAIVO_EXPORT_NAME, pwd=pwd))
+
+
+def verify_raivo_file(
+    twofas_services: List[dict],
+    raivo_file: Path | BinaryIO | bytes,
+    password: str = None,
+    timestamps: Iterable[int] = None,
+) -> VerificationReport:
+    """Verify a Raivo export zip against the 2FAS services it was built from"""
+    with stage("read_raivo"):
+        entries = read_raivo_entries(raivo_file, password)
+    return verify_services(twofas_services, entries, timestamps)
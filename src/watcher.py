@@ -0,0 +1,157 @@
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Executor, Future
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from src.archive import COMPRESSION_LEVEL
+from src.helpers import (
+    ConversionResult,
+    convert_2fas_file,
+    get_2fas_files,
+    get_dst_file,
+    init_worker,
+    worker_backends,
+)
+from src.loader import InputLimits, input_limits
+
+POLL_INTERVAL = 1.0
+SETTLE_TIME = 2.0
+
+
+def _init_worker(kdf_backend: str, zip_backend: str):
+    """Leave Ctrl+C to the parent and use its KDF and zip backends.
+
+    Running conversions can then finish on Ctrl+C, and spawned workers do
+    not fall back to the default backends.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    init_worker(kdf_backend, zip_backend)
+
+
+class Watcher:
+    """Poll a spool directory and convert new or changed .2fas files.
+
+    A file is only picked up once its size and mtime have not changed for
+    'settle_time' seconds, so backups still being written are left alone.
+    """
+
+    def __init__(
+        self,
+        src_dir: Path,
+        dst_dir: Path,
+        password: str = None,
+        max_workers: int = None,
+        compression_level: int = COMPRESSION_LEVEL,
+        strict: bool = False,
+        limits: InputLimits = input_limits,
+        interval: float = POLL_INTERVAL,
+        settle_time: float = SETTLE_TIME,
+        on_result: Callable[[ConversionResult], None] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not isinstance(src_dir, Path) or not isinstance(dst_dir, Path):
+            raise TypeError("'src_dir' and 'dst_dir' must be Path objects.")
+        if interval <= 0 or settle_time < 0:
+            raise ValueError("'interval' must be > 0 and 'settle_time' >= 0.")
+        self.src_dir = src_dir
+        self.dst_dir = dst_dir
+        self.password = password
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.compression_level = compression_level
+        self.strict = strict
+        self.limits = limits
+        self.max_pending = self.max_workers * 2
+        self.interval = interval
+        self.settle_time = settle_time
+        self.on_result = on_result
+        self.clock = clock
+        self.stop_event = threading.Event()
+        # path -> (signature, time the signature was first seen)
+        self._seen: Dict[Path, tuple] = {}
+        # path -> signature of the last conversion that was submitted
+        self._converted: Dict[Path, tuple] = {}
+        self._pending: Dict[Path, Future] = {}
+
+    def poll(self) -> List[Path]:
+        """Return the files that settled and still need converting"""
+        now = self.clock()
+        ready = []
+        present = set()
+        for src_file in get_2fas_files(self.src_dir):
+            try:
+                st = src_file.stat()
+            except FileNotFoundError:
+                continue
+            present.add(src_file)
+            signature = (st.st_size, st.st_mtime_ns)
+            seen = self._seen.get(src_file)
+            if seen is None or seen[0] != signature:
+                self._seen[src_file] = (signature, now)
+                if self.settle_time > 0:
+                    continue
+                seen = self._seen[src_file]
+            if now - seen[1] < self.settle_time:
+                continue
+            if self._converted.get(src_file) == signature:
+                continue
+            if src_file in self._pending:
+                continue
+            ready.append(src_file)
+        for src_file in set(self._seen) - present:
+            del self._seen[src_file]
+            self._converted.pop(src_file, None)
+        return ready
+
+    def _submit(self, executor: Executor, ready: List[Path]):
+        for src_file in ready:
+            if len(self._pending) >= self.max_pending:
+                # Leave the rest for the next poll instead of queueing unboundedly
+                return
+            self._converted[src_file] = self._seen[src_file][0]
+            self._pending[src_file] = executor.submit(
+                convert_2fas_file,
+                src_file,
+                get_dst_file(src_file, self.dst_dir),
+                self.password,
+                self.compression_level,
+                self.strict,
+                self.limits,
+            )
+
+    def _collect(self, wait: bool = False):
+        for src_file, future in list(self._pending.items()):
+            if not wait and not future.done():
+                continue
+            del self._pending[src_file]
+            if future.cancelled():
+                self._converted.pop(src_file, None)
+                continue
+            result = future.result()
+            if self.on_result is not None:
+                self.on_result(result)
+
+    def run(self):
+        """Watch until 'stop()' is called, then drain running conversions"""
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.dst_dir.mkdir(parents=True, exist_ok=True)
+        with ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=worker_backends(),
+        ) as executor:
+            try:
+                while not self.stop_event.is_set():
+                    self._collect()
+                    self._submit(executor, self.poll())
+                    self.stop_event.wait(self.interval)
+            finally:
+                for future in self._pending.values():
+                    future.cancel()
+                self._collect(wait=True)
+
+    def stop(self):
+        self.stop_event.set()
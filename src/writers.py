@@ -0,0 +1,274 @@
+import csv
+import io
+import json
+import os
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator
+from urllib.parse import quote, urlencode
+
+from src.archive import (
+    COMPRESSION_LEVEL,
+    EncryptedZipWriter,
+    compress_file,
+    use_pyminizip,
+)
+from src.raivo import RAIVO_EXPORT_NAME, RaivoEntry
+
+DEFAULT_FORMAT = "raivo"
+WRITERS: Dict[str, type] = {}
+
+
+def register_writer(cls: type) -> type:
+    """Make an OutputWriter subclass selectable by its 'name'"""
+    WRITERS[cls.name] = cls
+    return cls
+
+
+def get_writer(output_format: str) -> type:
+    """Look up the OutputWriter registered for 'output_format'"""
+    if output_format not in WRITERS:
+        raise ValueError(f"'output_format' must be one of: {', '.join(WRITERS)}.")
+    return WRITERS[output_format]
+
+
+class OutputWriter(ABC):
+    """Streaming sink receiving Raivo entries one at a time.
+
+    Subclasses set 'name' and 'suffix' and implement 'write'; 'close'
+    finishes the output but leaves the underlying stream open. 'encrypted'
+    tells whether the output protects the secrets with the password.
+    """
+
+    name = None
+    suffix = None
+    encrypted = False
+
+    def __init__(
+        self,
+        fileobj: BinaryIO,
+        password: str | None = None,
+        compression_level: int = COMPRESSION_LEVEL,
+    ):
+        self.fileobj = fileobj
+        self.count = 0
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+    @abstractmethod
+    def write(self, entry: dict):
+        """Append one Raivo entry to the output"""
+
+    def close(self):
+        self._closed = True
+
+
+@register_writer
+class JSONWriter(OutputWriter):
+    """Plain JSON array of Raivo entries, as found inside the Raivo zip"""
+
+    name = "json"
+    suffix = ".json"
+
+    def __init__(
+        self,
+        fileobj: BinaryIO,
+        password: str | None = None,
+        compression_level: int = COMPRESSION_LEVEL,
+    ):
+        super().__init__(fileobj, password, compression_level)
+        self._out = self._open(fileobj, password, compression_level)
+        self._out.write(b"[")
+
+    def _open(self, fileobj: BinaryIO, password: str, compression_level: int):
+        return fileobj
+
+    def write(self, entry: dict):
+        if self.count > 0:
+            self._out.write(b", ")
+        self._out.write(json.dumps(entry).encode("utf-8"))
+        self.count += 1
+
+    def close(self):
+        if self._closed:
+            return
+        self._out.write(b"]")
+        super().close()
+
+
+@register_writer
+class RaivoZipWriter(JSONWriter):
+    """Password-protected Raivo export, streamed into a single zip member"""
+
+    name = "raivo"
+    suffix = ".zip"
+    encrypted = True
+
+    def _open(self, fileobj: BinaryIO, password: str, compression_level: int):
+        self._archive = EncryptedZipWriter(fileobj, password, compression_level)
+        return self._archive.open(RAIVO_EXPORT_NAME)
+
+    def close(self):
+        if self._closed:
+            return
+        super().close()
+        self._out.close()
+        self._archive.close()
+
+
+class TextWriter(OutputWriter):
+    """Base of the writers producing UTF-8 text"""
+
+    def __init__(
+        self,
+        fileobj: BinaryIO,
+        password: str | None = None,
+        compression_level: int = COMPRESSION_LEVEL,
+    ):
+        super().__init__(fileobj, password, compression_level)
+        self._text = io.TextIOWrapper(fileobj, encoding="utf-8", newline="")
+
+    def close(self):
+        if self._closed:
+            return
+        self._text.flush()
+        # Hand the binary stream back to the caller instead of closing it
+        self._text.detach()
+        super().close()
+
+
+def otpauth_uri(entry: dict) -> str:
+    """Build the otpauth:// key URI of a Raivo entry"""
+    kind = (entry.get("kind") or "TOTP").lower()
+    issuer, account = entry.get("issuer") or "", entry.get("account") or ""
+    label = quote(account, safe="@")
+    if issuer:
+        label = f"{quote(issuer, safe='')}:{label}"
+    params = {
+        "secret": entry.get("secret"),
+        "issuer": issuer,
+        "algorithm": entry.get("algorithm"),
+        "digits": entry.get("digits"),
+    }
+    if kind == "hotp":
+        params["counter"] = entry.get("counter")
+    else:
+        params["period"] = entry.get("timer")
+    return f"otpauth://{kind}/{label}?{urlencode(params, quote_via=quote)}"
+
+
+@register_writer
+class OtpauthWriter(TextWriter):
+    """One otpauth:// URI per line, as encoded in authenticator QR codes"""
+
+    name = "otpauth"
+    suffix = ".txt"
+
+    def write(self, entry: dict):
+        self._text.write(otpauth_uri(entry))
+        self._text.write("\n")
+        self.count += 1
+
+
+@register_writer
+class CSVWriter(TextWriter):
+    """CSV with a header row and one Raivo entry per row"""
+
+    name = "csv"
+    suffix = ".csv"
+
+    def __init__(
+        self,
+        fileobj: BinaryIO,
+        password: str | None = None,
+        compression_level: int = COMPRESSION_LEVEL,
+    ):
+        super().__init__(fileobj, password, compression_level)
+        self._csv = csv.DictWriter(
+            self._text,
+            fieldnames=[key for _, key in RaivoEntry._keys],
+            extrasaction="ignore",
+        )
+        self._csv.writeheader()
+
+    def write(self, entry: dict):
+        self._csv.writerow(entry)
+        self.count += 1
+
+
+def get_output_file(dst_file: Path, output_format: str = DEFAULT_FORMAT) -> Path:
+    """Give 'dst_file' the suffix of 'output_format'"""
+    suffix = get_writer(output_format).suffix
+    return dst_file if dst_file.suffix == suffix else dst_file.with_suffix(suffix)
+
+
+def open_output(dst_file: Path, output_format: str = DEFAULT_FORMAT) -> BinaryIO:
+    """Open 'dst_file' for writing; unencrypted outputs are made owner-only"""
+    if get_writer(output_format).encrypted:
+        return open(dst_file, "wb")
+    fd = os.open(dst_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    # The mode only applies to new files
+    if hasattr(os, "fchmod"):
+        os.fchmod(fd, 0o600)
+    return open(fd, "wb")
+
+
+@contextmanager
+def open_writer(
+    dst_file: Path,
+    output_format: str = DEFAULT_FORMAT,
+    password: str = None,
+    compression_level: int = COMPRESSION_LEVEL,
+) -> Iterator[OutputWriter]:
+    """Open the 'output_format' writer on 'dst_file', removing it on failure.
+
+    With the pyminizip backend selected, Raivo zips are streamed as JSON to a
+    private temporary directory and zipped by pyminizip once the writer is
+    closed; otherwise they are zipped as they are written.
+    """
+    writer_cls = get_writer(output_format)
+    try:
+        if writer_cls is RaivoZipWriter and use_pyminizip(compression_level):
+            import tempfile
+
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                member = Path(tmp_dir, RAIVO_EXPORT_NAME)
+                with open_output(member, JSONWriter.name) as f:
+                    writer = JSONWriter(f)
+                    yield writer
+                    writer.close()
+                compress_file(member, dst_file, password, compression_level)
+        else:
+            with open_output(dst_file, output_format) as dst:
+                writer = writer_cls(dst, password, compression_level)
+                yield writer
+                writer.close()
+    except Exception:
+        dst_file.unlink(missing_ok=True)
+        raise
+
+
+def save_entries(
+    entries: Iterable[dict],
+    dst_file: Path,
+    output_format: str = DEFAULT_FORMAT,
+    password: str = None,
+    compression_level: int = COMPRESSION_LEVEL,
+) -> int:
+    """Stream 'entries' to 'dst_file' in 'output_format'.
+
+    'entries' may be a generator, so the full list never has to be built.
+    The partial output is removed if anything fails. Returns the number of
+    written entries.
+    """
+    with open_writer(dst_file, output_format, password, compression_level) as writer:
+        for entry in entries:
+            writer.write(entry)
+    return writer.count
@@ -7,3 +7,13 @@ def test_data_directory():
     cwd = Path.cwd()
     test_data_dir = Path.joinpath(cwd, "tests", "test_data")
     return test_data_dir
+
+
+@pytest.fixture(params=["builtin", "pyminizip"])
+def zip_backend(request, monkeypatch):
+    from src import archive
+
+    if request.param == "pyminizip":
+        pytest.importorskip("pyminizip")
+    monkeypatch.setattr(archive, "_zip_backend", request.param)
+    return request.param
@@ -0,0 +1,73 @@
+import io
+import json
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from src.converter import Converter, ConverterPool
+from src.raivo import RAIVO_EXPORT_NAME
+
+
+def read_issuers(data: bytes, password: str | None) -> list:
+    pwd = password.encode() if password else None
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        return [
+            e["issuer"] for e in json.loads(archive.read(RAIVO_EXPORT_NAME, pwd=pwd))
+        ]
+
+
+def test_converter_reuse(test_data_directory):
+    backups = test_data_directory.joinpath("backups")
+    encrypted = backups.joinpath("backup_encrypted.2fas").read_bytes()
+    unencrypted = backups.joinpath("backup_unencrypted.2fas").read_bytes()
+    with Converter() as converter:
+        for _ in range(3):
+            assert read_issuers(
+                converter.convert_bytes(encrypted, "test123"), "test123"
+            ) == ["Test"]
+            assert read_issuers(converter.convert_bytes(unencrypted), None) == ["Test"]
+        assert converter.jobs == 6
+        assert len(converter.key_cache) == 1
+        with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+            dst = Path(temp_dir).joinpath("export.zip")
+            converter.convert_file(
+                backups.joinpath("backup_encrypted.2fas"), dst, "test123"
+            )
+            assert read_issuers(dst.read_bytes(), "test123") == ["Test"]
+    assert len(converter.key_cache) == 0
+
+
+def test_converter_reset_after_error(test_data_directory):
+    backups = test_data_directory.joinpath("backups")
+    converter = Converter()
+    with pytest.raises(ValueError):
+        converter.convert_bytes(
+            backups.joinpath("backup_encrypted.2fas").read_bytes(), "wrong"
+        )
+    assert converter._entries == []
+    data = backups.joinpath("backup_unencrypted.2fas").read_bytes()
+    assert read_issuers(converter.convert_bytes(data), None) == ["Test"]
+
+
+def test_converter_pool(test_data_directory):
+    data = test_data_directory.joinpath("backups", "backup_encrypted.2fas").read_bytes()
+    pool = ConverterPool(2)
+
+    def convert(_):
+        with pool.acquire() as converter:
+            return converter.convert_bytes(data, "test123")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(convert, range(8)))
+    assert all(read_issuers(r, "test123") == ["Test"] for r in results)
+    assert len(pool.key_cache) == 1
+    pool.close()
+    assert len(pool.key_cache) == 0
+
+
+def test_converter_pool_error():
+    with pytest.raises(ValueError):
+        ConverterPool(0)
@@ -1,5 +1,144 @@
 import pytest
 
-from src.crypto import encrypt_ciphertext, decrypt_ciphertext
+from src import crypto
+from src.crypto import (
+    AES_BUFFER_PADDING,
+    ITERATIONS,
+    KDF_BACKENDS,
+    KeyCache,
+    decrypt_ciphertext,
+    derive_key,
+    encrypt_ciphertext,
+    set_kdf_backend,
+    wipe,
+)
 
-# TODO
\ No newline at end of file
+
+def test_derive_key_cache_hit(monkeypatch):
+    cache = KeyCache(max_size=2)
+    calls = []
+    monkeypatch.setattr(
+        "src.crypto._pbkdf2", lambda p, s, *args: calls.append(1) or b"k" * 32
+    )
+    assert derive_key(b"pwd", b"salt", cache) == derive_key(b"pwd", b"salt", cache)
+    assert len(calls) == 1
+
+
+def test_key_cache_eviction_and_clear():
+    cache = KeyCache(max_size=2)
+    for salt in (b"a", b"b", b"c"):
+        cache.put(b"pwd", salt, salt * 32)
+    assert len(cache) == 2
+    assert cache.get(b"pwd", b"a") is None
+    assert cache.get(b"pwd", b"c") == b"c" * 32
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_key_cache_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("src.crypto.time.monotonic", lambda: now[0])
+    cache = KeyCache(ttl=10)
+    cache.put(b"pwd", b"salt", b"k" * 32)
+    assert cache.get(b"pwd", b"salt") == b"k" * 32
+    now[0] += 10
+    assert cache.get(b"pwd", b"salt") is None
+
+
+@pytest.mark.parametrize(
+    ("max_size", "ttl"),
+    [
+        pytest.param(-1, 10, id="negative_max_size"),
+        pytest.param(1, 0, id="non_positive_ttl"),
+    ],
+)
+def test_key_cache_error(max_size, ttl):
+    with pytest.raises(ValueError):
+        KeyCache(max_size=max_size, ttl=ttl)
+
+
+def test_wipe():
+    key, plain_text = bytearray(b"key"), bytearray(b"secret")
+    wipe(key, memoryview(plain_text)[:3], None)
+    assert key == bytes(3)
+    assert plain_text == b"\0\0\0ret"
+
+
+def test_derive_key_into():
+    cache = KeyCache()
+    out = bytearray(32)
+    assert derive_key(b"pwd", b"salt", cache, out=out) is out
+    assert out == derive_key(b"pwd", b"salt", None)
+    cached = bytearray(32)
+    assert cache.get_into(b"pwd", b"salt", cached)
+    assert cached == out
+
+
+@pytest.mark.parametrize("backend", list(KDF_BACKENDS))
+@pytest.mark.parametrize(
+    ("password", "salt", "iterations", "expected"),
+    [
+        pytest.param(
+            b"password",
+            b"salt",
+            1,
+            "120fb6cffcf8b32c43e7225256c4f837a86548c92ccc35480805987cb70be17b",
+            id="one_iteration",
+        ),
+        pytest.param(
+            b"password",
+            b"salt",
+            4096,
+            "c5e478d59288c841aa530db6845c4c8d962893a001ce4e11a4963873aa98134a",
+            id="4096_iterations",
+        ),
+    ],
+)
+def test_derive_key_backends(backend, password, salt, iterations, expected):
+    key = derive_key(password, salt, None, iterations=iterations, backend=backend)
+    assert key.hex() == expected
+    out = bytearray(32)
+    derive_key(bytearray(password), memoryview(salt), None, out, iterations, backend)
+    assert out.hex() == expected
+
+
+def test_derive_key_backends_are_identical(monkeypatch):
+    keys = set()
+    for backend in KDF_BACKENDS:
+        monkeypatch.setattr(crypto, "_kdf_backend", crypto._kdf_backend)
+        set_kdf_backend(backend)
+        keys.add(derive_key(b"test123", bytes(range(32)), None))
+    assert len(keys) == 1
+    with pytest.raises(ValueError):
+        set_kdf_backend("scrypt")
+    with pytest.raises(ValueError):
+        derive_key(b"test123", b"salt", None, iterations=0)
+
+
+def test_key_cache_is_keyed_by_iterations():
+    cache = KeyCache()
+    key = derive_key(b"pwd", b"salt", cache)
+    assert cache.get(b"pwd", b"salt", ITERATIONS) == key
+    assert cache.get(b"pwd", b"salt", 1) is None
+    assert derive_key(b"pwd", b"salt", cache, iterations=1) != key
+
+
+@pytest.mark.parametrize("preallocated", [False, True], ids=["owned", "out"])
+def test_decrypt_ciphertext_into(preallocated):
+    salt, iv = b"s" * 32, b"i" * 12
+    cipher_text, auth_tag = encrypt_ciphertext(b"[1, 2, 3]", b"pwd", salt, iv, None)
+    out = bytearray(len(cipher_text) + AES_BUFFER_PADDING) if preallocated else None
+    plain_text, _ = decrypt_ciphertext(
+        memoryview(cipher_text), b"pwd", salt, iv, auth_tag, None, out
+    )
+    assert plain_text == b"[1, 2, 3]"
+    assert isinstance(plain_text, memoryview if preallocated else bytearray)
+
+
+def test_decrypt_ciphertext_wipes_on_failure():
+    salt, iv = b"s" * 32, b"i" * 12
+    cipher_text, _ = encrypt_ciphertext(b"[1, 2, 3]", b"pwd", salt, iv, None)
+    out = bytearray(len(cipher_text) + AES_BUFFER_PADDING)
+    with pytest.raises(ValueError):
+        decrypt_ciphertext(cipher_text, b"pwd", salt, iv, b"t" * 16, None, out)
+    assert out == bytes(len(out))
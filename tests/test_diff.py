@@ -0,0 +1,77 @@
+import json
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from benchmarks.synthetic import make_vault
+from src.diff import diff_2fas_to_raivo, diff_entries
+from src.raivo import RaivoEntry, RaivoFile
+from src.verify import read_raivo_entries
+
+
+def raivo_entries(services: list) -> list:
+    return [entry.asdict() for entry in RaivoEntry.from_twofas_services(services)]
+
+
+def test_diff_entries():
+    previous = raivo_entries(make_vault(5)["services"])
+    current = [dict(entry) for entry in previous]
+    current[1]["digits"] = "8" if current[1]["digits"] == "6" else "6"
+    del current[2]
+    current.append({**previous[0], "issuer": "New"})
+
+    result = diff_entries(previous, current)
+    assert [entry["issuer"] for entry in result.added] == ["New"]
+    assert [entry["issuer"] for entry in result.changed] == ["Service 1"]
+    assert [entry["issuer"] for entry in result.removed] == ["Service 2"]
+    assert result.unchanged == 3
+
+
+@pytest.mark.parametrize(
+    ("previous", "current", "counts"),
+    [
+        pytest.param(["A"], ["A", "A"], (1, 0, 0, 1), id="new_duplicate"),
+        pytest.param(["A", "A"], ["A"], (0, 0, 1, 1), id="removed_duplicate"),
+        pytest.param([" a b "], ["AB"], (0, 1, 0, 0), id="secret_formatting"),
+    ],
+)
+def test_diff_entries_keys(previous, current, counts):
+    def entries(secrets):
+        return [{"issuer": "I", "account": "a", "secret": s} for s in secrets]
+
+    result = diff_entries(entries(previous), entries(current))
+    assert (
+        len(result.added),
+        len(result.changed),
+        len(result.removed),
+        result.unchanged,
+    ) == counts
+
+
+def test_diff_2fas_to_raivo(test_data_directory):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        root = Path(temp_dir)
+        vault = make_vault(20)
+        previous = root.joinpath("previous.zip")
+        RaivoFile(previous, "test123", raivo_entries(vault["services"])).save()
+
+        vault["services"][3]["otp"]["period"] = 60
+        del vault["services"][7]
+        vault["services"].append(make_vault(21)["services"][20])
+        src = root.joinpath("vault.2fas")
+        src.write_text(json.dumps(vault))
+
+        dst = root.joinpath("delta.zip")
+        result = diff_2fas_to_raivo(src, previous, dst, "test123")
+        assert result.unchanged == 18
+
+        delta = read_raivo_entries(dst, "test123")
+        assert [entry["issuer"] for entry in delta] == ["Service 20", "Service 3"]
+        assert delta[1]["timer"] == "60"
+
+        summary = json.loads(root.joinpath("delta.summary.json").read_text())
+        assert summary["removed"] == [
+            {"issuer": "Service 7", "account": "user7@example.com"}
+        ]
+        assert "secret" not in json.dumps(summary)
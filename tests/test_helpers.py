@@ -1,7 +1,24 @@
+import io
+import json
 import pytest
+import concurrent.futures
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 import tempfile
-from src.helpers import get_2fas_files, get_file_to_process, convert_2fas_to_raivo
+import zipfile
+from src.helpers import (
+    convert_2fas_bytes,
+    convert_2fas_files,
+    convert_2fas_to_raivo,
+    get_2fas_files,
+    get_file_to_process,
+    stream_2fas_to_raivo,
+    twofas_service_to_raivo,
+)
+from benchmarks.synthetic import write_vault
+from src import crypto
+from src.manifest import MANIFEST_NAME, Manifest
+from src.raivo import RAIVO_EXPORT_NAME
 
 
 @pytest.mark.parametrize(
@@ -125,3 +142,157 @@ def test_convert_2fas_to_raivo_error(
         with pytest.raises(exception):
             dst = Path(temp_dir).joinpath(dst_file)
             convert_2fas_to_raivo(src, dst, password)
+
+
+@pytest.mark.parametrize(
+    ("password", "expected_success"),
+    [
+        pytest.param(
+            "test123",
+            {"backup_unencrypted.2fas": True, "backup_encrypted.2fas": True},
+            id="convert_backups_with_password",
+        ),
+        pytest.param(
+            None,
+            {"backup_unencrypted.2fas": True, "backup_encrypted.2fas": False},
+            id="convert_backups_without_password",
+        ),
+    ],
+)
+def test_convert_2fas_files(test_data_directory, password, expected_success):
+    src_files = get_2fas_files(test_data_directory.joinpath("backups"))
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        dst_dir = Path(temp_dir).joinpath("exports")
+        results = list(convert_2fas_files(src_files, dst_dir, password, 2))
+        assert {r.src_file.name: r.success for r in results} == expected_success
+        for result in results:
+            assert result.dst_file.exists() == result.success
+
+
+def test_stream_2fas_to_raivo(test_data_directory):
+    src = test_data_directory.joinpath("backups", "backup_unencrypted.2fas")
+    with open(src, "r") as f:
+        services = json.load(f)["services"]
+    expected = [twofas_service_to_raivo(service).asdict() for service in services]
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        dst = Path(temp_dir).joinpath("raivo_export.zip")
+        assert stream_2fas_to_raivo(src, dst, "test123", chunk_size=16) == 1
+        with zipfile.ZipFile(dst) as archive:
+            result = json.loads(archive.read(RAIVO_EXPORT_NAME, pwd=b"test123"))
+        assert result == expected
+
+
+def test_stream_2fas_to_raivo_error(test_data_directory):
+    src = test_data_directory.joinpath("backups", "backup_encrypted.2fas")
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        dst = Path(temp_dir).joinpath("raivo_export.zip")
+        with pytest.raises(ValueError):
+            stream_2fas_to_raivo(src, dst, "test123")
+        assert not dst.exists()
+
+
+@pytest.mark.parametrize("password", ["test123", None], ids=["encrypted", "plain"])
+def test_convert_2fas_to_raivo_synthetic(test_data_directory, password):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        src = write_vault(Path(temp_dir).joinpath("vault.2fas"), 50, password)
+        dst = Path(temp_dir).joinpath("raivo_export.zip")
+        for _ in range(2):
+            convert_2fas_to_raivo(src, dst, password)
+        pwd = password.encode() if password else None
+        with zipfile.ZipFile(dst) as archive:
+            result = json.loads(archive.read(RAIVO_EXPORT_NAME, pwd=pwd))
+        assert [entry["issuer"] for entry in result] == [
+            f"Service {i}" for i in range(50)
+        ]
+
+
+def test_convert_2fas_files_incremental(test_data_directory):
+    src_files = [test_data_directory.joinpath("backups", "backup_unencrypted.2fas")]
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        dst_dir = Path(temp_dir)
+        manifest = Manifest(dst_dir.joinpath(MANIFEST_NAME))
+        for expected_skipped in (False, True):
+            results = list(convert_2fas_files(src_files, dst_dir, None, 1, manifest))
+            assert [(r.success, r.skipped) for r in results] == [
+                (True, expected_skipped)
+            ]
+        results[0].dst_file.write_bytes(b"tampered")
+        results = list(convert_2fas_files(src_files, dst_dir, None, 1, manifest))
+        assert [(r.success, r.skipped) for r in results] == [(True, False)]
+
+
+def test_convert_2fas_bytes(test_data_directory):
+    backups = test_data_directory.joinpath("backups")
+    sources = [
+        (backups.joinpath("backup_unencrypted.2fas").read_bytes(), None),
+        (backups.joinpath("backup_encrypted.2fas").read_bytes(), "test123"),
+    ] * 8
+
+    def convert(job):
+        data, password = job
+        return convert_2fas_bytes(io.BytesIO(data), password), password
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(convert, sources))
+
+    for result, password in results:
+        pwd = password.encode() if password else None
+        with zipfile.ZipFile(io.BytesIO(result)) as archive:
+            entries = json.loads(archive.read(RAIVO_EXPORT_NAME, pwd=pwd))
+        assert [entry["issuer"] for entry in entries] == ["Test"]
+
+
+@pytest.mark.parametrize(
+    ("data", "password", "exception"),
+    [
+        pytest.param(b"[]", None, ValueError, id="not_an_object"),
+        pytest.param(b"{", None, ValueError, id="invalid_json"),
+    ],
+)
+def test_convert_2fas_bytes_error(data, password, exception):
+    with pytest.raises(exception):
+        convert_2fas_bytes(data, password)
+
+
+class FreshWorkerPool:
+    """Run jobs in-process, in the state of a freshly spawned worker"""
+
+    def __init__(self, max_workers=None, initializer=None, initargs=()):
+        crypto.set_kdf_backend(crypto.DEFAULT_KDF_BACKEND)
+        if initializer is not None:
+            initializer(*initargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def test_convert_2fas_files_kdf_backend(test_data_directory, monkeypatch):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        src_files = [
+            write_vault(Path(temp_dir).joinpath(f"vault{i}.2fas"), 3, "test123")
+            for i in range(2)
+        ]
+        crypto.clear_key_cache()
+
+        used = []
+        hashlib_pbkdf2 = crypto.KDF_BACKENDS["hashlib"]
+        monkeypatch.setitem(
+            crypto.KDF_BACKENDS,
+            "hashlib",
+            lambda *args: used.append(args) or hashlib_pbkdf2(*args),
+        )
+        monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", FreshWorkerPool)
+        monkeypatch.setattr(crypto, "_kdf_backend", "hashlib")
+
+        dst_dir = Path(temp_dir).joinpath("out")
+        results = list(convert_2fas_files(src_files, dst_dir, "test123"))
+    assert all(result.success for result in results)
+    assert len(used) == 1
@@ -0,0 +1,109 @@
+import json
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from benchmarks.synthetic import make_vault
+from src import loader
+from src.loader import InputLimits, load_2fas_data, load_2fas_file
+from src.twofas import TwofasFile
+
+
+def expected_services(vault: dict, password: str = None) -> list:
+    src = TwofasFile(
+        file_path=None,
+        services_encrypted=vault["servicesEncrypted"],
+        services=list(vault["services"]),
+        password=password,
+    )
+    if src.encrypted:
+        src.decrypt(None)
+    return src.services
+
+
+@pytest.mark.parametrize("mmap", [True, False], ids=["mmap", "read"])
+@pytest.mark.parametrize("password", ["test123", None], ids=["encrypted", "plain"])
+def test_load_2fas_file(monkeypatch, test_data_directory, mmap, password):
+    if mmap:
+        monkeypatch.setattr(loader, "MMAP_THRESHOLD", 0)
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        vault = make_vault(20, password)
+        src_file = Path(temp_dir).joinpath("vault.2fas")
+        src_file.write_text(json.dumps(vault, indent=4))
+        src = load_2fas_file(src_file, password, key_cache=None)
+        assert src.services == expected_services(vault, password)
+        assert src.file_path == src_file
+
+
+@pytest.mark.parametrize(
+    "escape",
+    [
+        pytest.param(lambda blob: blob.replace("/", "\\/"), id="escaped_slashes"),
+        pytest.param(lambda blob: blob.replace("/", "\\u002F"), id="unicode_escapes"),
+        pytest.param(
+            lambda blob: "\\n".join(blob[i : i + 76] for i in range(0, len(blob), 76)),
+            id="line_wrapped",
+        ),
+        pytest.param(
+            lambda blob: blob.replace("/", "\\/").replace(":", "\\r\\n:"),
+            id="mixed_escapes",
+        ),
+    ],
+)
+def test_load_2fas_data_escaped_blob(escape):
+    vault = make_vault(20, "test123")
+    blob = vault["servicesEncrypted"]
+    assert "/" in blob
+    raw = json.dumps({**vault, "servicesEncrypted": "BLOB"}).replace(
+        "BLOB", escape(blob)
+    )
+    src = load_2fas_data(raw.encode(), "test123", key_cache=None)
+    assert src.services == expected_services(vault, "test123")
+
+
+def test_load_2fas_file_backup(monkeypatch, test_data_directory):
+    monkeypatch.setattr(loader, "MMAP_THRESHOLD", 0)
+    src_file = test_data_directory.joinpath("backups", "backup_encrypted.2fas")
+    src = load_2fas_file(src_file, "test123", key_cache=None)
+    assert src.services == expected_services(
+        json.loads(src_file.read_text()), "test123"
+    )
+
+
+@pytest.mark.parametrize("password", ["test123", None], ids=["encrypted", "plain"])
+@pytest.mark.parametrize(
+    ("limits", "message"),
+    [
+        pytest.param(InputLimits(max_file_size=1024), "bytes", id="file_size"),
+        pytest.param(InputLimits(max_services=19), "services", id="services"),
+    ],
+)
+def test_load_2fas_file_limits(
+    monkeypatch, test_data_directory, password, limits, message
+):
+    monkeypatch.setattr(loader, "MMAP_THRESHOLD", 0)
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        src_file = Path(temp_dir).joinpath("vault.2fas")
+        src_file.write_text(json.dumps(make_vault(20, password)))
+        with pytest.raises(ValueError, match=message):
+            load_2fas_file(src_file, password, key_cache=None, limits=limits)
+        assert len(load_2fas_file(src_file, password, key_cache=None).services) == 20
+
+
+@pytest.mark.parametrize(
+    ("raw", "password"),
+    [
+        pytest.param(b"[]", None, id="not_an_object"),
+        pytest.param(b'{"servicesEncrypted": "abc', None, id="unterminated"),
+        pytest.param(None, "wrong", id="wrong_password"),
+    ],
+)
+def test_load_2fas_file_error(monkeypatch, test_data_directory, raw, password):
+    monkeypatch.setattr(loader, "MMAP_THRESHOLD", 0)
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        src_file = Path(temp_dir).joinpath("vault.2fas")
+        src_file.write_bytes(raw or json.dumps(make_vault(3, "test123")).encode())
+        # The memory map must close cleanly whatever the error
+        with pytest.raises(ValueError):
+            load_2fas_file(src_file, password, key_cache=None)
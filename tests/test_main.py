@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        pytest.param("cryptography", id="cryptography"),
+        pytest.param("loguru", id="loguru"),
+        pytest.param("multiprocessing", id="multiprocessing"),
+        pytest.param("asyncio", id="asyncio"),
+        pytest.param("pyminizip", id="pyminizip"),
+        pytest.param("tempfile", id="tempfile"),
+    ],
+)
+def test_main_import_is_lazy(module):
+    probe = f"import sys, src.main; print({module!r} in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=REPO_ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert out.stdout.strip() == "False"
+
+
+def test_help_creates_no_logs(test_data_directory):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as tmp_dir:
+        subprocess.run(
+            [sys.executable, "-m", "src.main", "--help"],
+            cwd=tmp_dir,
+            env={**os.environ, "PYTHONPATH": str(REPO_ROOT)},
+            check=True,
+            capture_output=True,
+        )
+        assert not Path(tmp_dir, "logs").exists()
+
+
+@pytest.mark.parametrize(
+    ("args", "message"),
+    [
+        pytest.param(["--batch", "--stream"], "--stream", id="stream_with_batch"),
+        pytest.param(["--watch", "--stream"], "--stream", id="stream_with_watch"),
+        pytest.param(
+            ["--watch", "--incremental"], "--incremental", id="incremental_with_watch"
+        ),
+        pytest.param(
+            ["--merge", "--incremental"], "--incremental", id="incremental_with_merge"
+        ),
+    ],
+)
+def test_unsupported_option_combinations(test_data_directory, args, message):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as tmp_dir:
+        out = subprocess.run(
+            [sys.executable, "-m", "src.main", *args],
+            cwd=tmp_dir,
+            env={**os.environ, "PYTHONPATH": str(REPO_ROOT)},
+            capture_output=True,
+            text=True,
+        )
+        assert out.returncode == 2
+        assert f"{message} only applies to" in out.stderr
@@ -0,0 +1,86 @@
+import hashlib
+import hmac
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from src.manifest import MANIFEST_NAME, Manifest
+
+
+@pytest.fixture
+def converted_files(test_data_directory):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        src = Path(temp_dir).joinpath("backup.2fas")
+        dst = Path(temp_dir).joinpath("backup.zip")
+        shutil.copy(
+            test_data_directory.joinpath("backups", "backup_unencrypted.2fas"), src
+        )
+        dst.write_bytes(b"converted")
+        yield src, dst
+
+
+def test_manifest_is_current(converted_files):
+    src, dst = converted_files
+    manifest = Manifest(src.parent.joinpath(MANIFEST_NAME))
+    options = manifest.options_digest("test123")
+    assert not manifest.is_current(src, dst, options)
+
+    manifest.record(src, dst, options)
+    manifest.save()
+    manifest = Manifest(src.parent.joinpath(MANIFEST_NAME))
+    assert manifest.is_current(src, dst, manifest.options_digest("test123"))
+    assert not manifest.is_current(src, dst, manifest.options_digest("other"))
+
+    # Touching a file without changing its content keeps it current
+    os.utime(src, ns=(1, 1))
+    assert manifest.is_current(src, dst, options)
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        pytest.param(lambda src, dst: src.write_text("{}"), id="source_changed"),
+        pytest.param(
+            lambda src, dst: dst.write_bytes(b"tampered"), id="output_tampered"
+        ),
+        pytest.param(lambda src, dst: dst.unlink(), id="output_missing"),
+    ],
+)
+def test_manifest_is_not_current(converted_files, change):
+    src, dst = converted_files
+    manifest = Manifest(src.parent.joinpath(MANIFEST_NAME))
+    options = manifest.options_digest(None)
+    manifest.record(src, dst, options)
+    change(src, dst)
+    assert not manifest.is_current(src, dst, options)
+
+
+def test_manifest_detects_edits_keeping_stat(converted_files):
+    src, dst = converted_files
+    manifest = Manifest(src.parent.joinpath(MANIFEST_NAME))
+    options = manifest.options_digest(None)
+    manifest.record(src, dst, options)
+
+    # Same size and mtime, as left by a quick rewrite on a coarse clock
+    stat = src.stat()
+    content = src.read_bytes()
+    src.write_bytes(content[:-1] + (b"x" if content[-1:] != b"x" else b"y"))
+    os.utime(src, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert not manifest.is_current(src, dst, options)
+
+
+def test_manifest_stores_no_fast_password_check(converted_files):
+    src, dst = converted_files
+    manifest = Manifest(src.parent.joinpath(MANIFEST_NAME))
+    manifest.record(src, dst, manifest.options_digest("test123"))
+    manifest.save()
+
+    key = bytes.fromhex(manifest.salt)
+    fast = hmac.new(key, b"test123", hashlib.sha256).hexdigest()
+    assert fast not in src.parent.joinpath(MANIFEST_NAME).read_text()
+    assert manifest.options_digest("test123") != Manifest(
+        src.parent.joinpath("other.json")
+    ).options_digest("test123")
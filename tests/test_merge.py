@@ -0,0 +1,65 @@
+import json
+import tempfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from src.merge import ServiceIndex, merge_2fas_files, normalize_secret
+from src.raivo import RAIVO_EXPORT_NAME
+
+
+def make_service(name, secret, updated_at, digits=6):
+    return {
+        "name": name,
+        "secret": secret,
+        "updatedAt": updated_at,
+        "otp": {"account": "test@test.com", "digits": digits},
+    }
+
+
+@pytest.mark.parametrize(
+    ("policy", "expected_digits"),
+    [
+        pytest.param("newest", [8, 6], id="newest_wins"),
+        pytest.param("first", [6, 6], id="first_wins"),
+        pytest.param("last", [7, 6], id="last_wins"),
+    ],
+)
+def test_service_index(policy, expected_digits):
+    index = ServiceIndex(policy)
+    index.update(
+        [
+            make_service("A", "jbsw y3dp", 1, digits=6),
+            make_service("B", "JBSWY3DP", 1),
+            make_service("A", "JBSWY3DP==", 3, digits=8),
+            make_service("A", "JBSW-Y3DP", 2, digits=7),
+        ]
+    )
+    assert (index.total, len(index), index.duplicates) == (4, 2, 2)
+    assert [s["otp"]["digits"] for s in index.services()] == expected_digits
+
+
+def test_service_index_error():
+    with pytest.raises(ValueError):
+        ServiceIndex("oldest")
+
+
+def test_normalize_secret():
+    assert normalize_secret(" jbsw-y3dp ehpk=== ") == "JBSWY3DPEHPK"
+    assert normalize_secret(None) == ""
+
+
+def test_merge_2fas_files(test_data_directory):
+    backups = test_data_directory.joinpath("backups")
+    src_files = [
+        backups.joinpath("backup_unencrypted.2fas"),
+        backups.joinpath("backup_encrypted.2fas"),
+    ]
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        dst = Path(temp_dir).joinpath("merged.zip")
+        index = merge_2fas_files(src_files, dst, "test123")
+        assert (index.total, len(index)) == (2, 1)
+        with zipfile.ZipFile(dst) as archive:
+            entries = json.loads(archive.read(RAIVO_EXPORT_NAME, pwd=b"test123"))
+        assert [entry["issuer"] for entry in entries] == ["Test"]
@@ -0,0 +1,50 @@
+import tempfile
+from pathlib import Path
+
+from src.helpers import convert_2fas_to_raivo
+from src.metrics import Metrics, collect, stage
+
+
+def test_stage_without_collector():
+    with stage("noop") as counters:
+        counters["bytes_in"] = 1
+
+
+def test_collect_nested_stages():
+    metrics = Metrics()
+    with collect(metrics):
+        with stage("outer"):
+            with stage("inner") as counters:
+                data = bytearray(1024 * 1024)
+                counters["bytes_out"] = len(data)
+            del data
+    report = metrics.report()
+    assert [(s["stage"], s["depth"]) for s in report["stages"]] == [
+        ("outer", 0),
+        ("inner", 1),
+    ]
+    outer, inner = report["stages"]
+    assert inner["bytes_out"] == 1024 * 1024
+    assert outer["peak_memory_bytes"] >= inner["peak_memory_bytes"] >= 1024 * 1024
+    assert report["total_wall_seconds"] == outer["wall_seconds"]
+
+
+def test_collect_conversion_stages(test_data_directory):
+    src = test_data_directory.joinpath("backups", "backup_encrypted.2fas")
+    metrics = Metrics()
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        with collect(metrics):
+            convert_2fas_to_raivo(src, Path(temp_dir).joinpath("export.zip"), "test123")
+    assert [s["stage"] for s in metrics.stages] == [
+        "read",
+        "parse",
+        "decrypt",
+        "base64",
+        "kdf",
+        "aes_gcm",
+        "decode",
+        "map",
+        "save",
+        "serialize",
+        "zip",
+    ]
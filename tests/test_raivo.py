@@ -0,0 +1,160 @@
+import io
+import json
+import tempfile
+import zipfile
+import zlib
+from pathlib import Path
+
+import pytest
+
+from src.archive import EncryptedZipWriter, set_zip_backend
+from src.raivo import RAIVO_EXPORT_NAME, RaivoEntry, RaivoFile
+
+
+def read_export(data: bytes, password: str | None) -> list:
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.namelist() == [RAIVO_EXPORT_NAME]
+        pwd = password.encode() if password else None
+        return json.loads(archive.read(RAIVO_EXPORT_NAME, pwd=pwd))
+
+
+@pytest.fixture
+def raivo_services():
+    return [
+        RaivoEntry(
+            secret="JBSWY3DPEHPK3PXP", issuer="Test", account="è@test.com"
+        ).asdict()
+    ]
+
+
+@pytest.mark.parametrize("password", ["test123", None], ids=["encrypted", "plain"])
+def test_raivo_file_to_bytes(raivo_services, password):
+    raivo_file = RaivoFile(
+        file_path=Path("export.zip"), password=password, services=raivo_services
+    )
+    assert read_export(raivo_file.to_bytes(), password) == raivo_services
+
+
+def test_raivo_file_save(test_data_directory, raivo_services, zip_backend, monkeypatch):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        if zip_backend == "builtin":
+            # The plaintext must never be staged on disk
+            monkeypatch.setattr(tempfile, "TemporaryDirectory", None)
+        raivo_file = RaivoFile(
+            file_path=Path(temp_dir).joinpath("export"),
+            password="test123",
+            services=raivo_services,
+        )
+        raivo_file.save()
+        assert raivo_file.file_path.suffix == ".zip"
+        assert (
+            read_export(raivo_file.file_path.read_bytes(), "test123") == raivo_services
+        )
+
+        buffer = io.BytesIO()
+        raivo_file.save(buffer)
+        assert read_export(buffer.getvalue(), "test123") == raivo_services
+
+
+@pytest.mark.parametrize(
+    "compression_level, compress_type",
+    [
+        pytest.param(0, zipfile.ZIP_STORED, id="stored"),
+        pytest.param(9, zipfile.ZIP_DEFLATED, id="deflated"),
+    ],
+)
+def test_raivo_file_compression_level(
+    test_data_directory, raivo_services, zip_backend, compression_level, compress_type
+):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        raivo_file = RaivoFile(
+            file_path=Path(temp_dir).joinpath("export.zip"),
+            password="test123",
+            services=raivo_services,
+            compression_level=compression_level,
+        )
+        raivo_file.save()
+        saved = raivo_file.file_path.read_bytes()
+    for data in (raivo_file.to_bytes(), saved):
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            assert archive.getinfo(RAIVO_EXPORT_NAME).compress_type == compress_type
+        assert read_export(data, "test123") == raivo_services
+
+
+def test_set_zip_backend_error():
+    with pytest.raises(ValueError):
+        set_zip_backend("zipfile")
+
+
+@pytest.mark.parametrize("compression_level", [0, 9], ids=["stored", "deflated"])
+def test_encrypted_zip_writer(compression_level):
+    buffer = io.BytesIO()
+    with EncryptedZipWriter(buffer, "test123", compression_level) as archive:
+        archive.writestr("a.json", b"[]" * 100)
+        archive.writestr("b.json", b"{}")
+    with zipfile.ZipFile(buffer) as archive:
+        assert archive.read("a.json", pwd=b"test123") == b"[]" * 100
+        assert archive.read("b.json", pwd=b"test123") == b"{}"
+        with pytest.raises((RuntimeError, zipfile.BadZipFile, zlib.error)):
+            archive.read("b.json", pwd=b"wrong")
+
+
+def test_encrypted_zip_writer_error():
+    with pytest.raises(ValueError):
+        EncryptedZipWriter(io.BytesIO(), "test123", 10)
+
+
+@pytest.mark.parametrize("compression_level", [0, 5], ids=["stored", "deflated"])
+@pytest.mark.parametrize("password", ["test123", None], ids=["encrypted", "plain"])
+def test_encrypted_zip_writer_open(compression_level, password):
+    buffer = io.BytesIO()
+    with EncryptedZipWriter(buffer, password, compression_level) as archive:
+        with archive.open("stream.json") as entry:
+            for i in range(1000):
+                entry.write(f"{i},".encode())
+    pwd = password.encode() if password else None
+    with zipfile.ZipFile(buffer) as archive:
+        expected = "".join(f"{i}," for i in range(1000)).encode()
+        assert archive.read("stream.json", pwd=pwd) == expected
+
+
+def test_raivo_entry_from_twofas_services(test_data_directory):
+    with open(test_data_directory.joinpath("backups", "backup_unencrypted.2fas")) as f:
+        services = json.load(f)["services"] * 3
+    entries = RaivoEntry.from_twofas_services(services)
+    assert len(entries) == 3
+    assert entries[0] == RaivoEntry(
+        secret="ABCDEFGHIJKLMNOPQRSTUZXYW0123456",
+        account="test@test.com",
+        issuer="Test",
+        algorithm="SHA1",
+        timer="30",
+        counter="0",
+        kind="TOTP",
+        digits="6",
+    )
+    assert list(entries[0].asdict()) == [
+        "secret",
+        "account",
+        "issuer",
+        "algorithm",
+        "timer",
+        "counter",
+        "kind",
+        "pinned",
+        "iconType",
+        "iconValue",
+        "digits",
+    ]
+    assert not hasattr(entries[0], "__dict__")
+
+
+def test_raivo_entry_from_twofas_services_error():
+    with pytest.raises(TypeError):
+        RaivoEntry.from_twofas_services([{"secret": "ABC", "otp": {}}])
+
+
+def test_raivo_file_default_services_are_not_shared():
+    first, second = RaivoFile(file_path=None), RaivoFile(file_path=None)
+    first.services.append({"issuer": "Test"})
+    assert second.services == []
@@ -0,0 +1,72 @@
+import json
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from benchmarks.synthetic import make_services
+from src.helpers import read_2fas_file
+from src.raivo import RaivoEntry, RaivoFile
+from src.reverse import read_raivo_files, reverse_raivo_to_2fas
+
+
+def raivo_entries(services: list) -> list:
+    return [entry.asdict() for entry in RaivoEntry.from_twofas_services(services)]
+
+
+@pytest.mark.parametrize(
+    ("exports", "workers"),
+    [
+        pytest.param(1, None, id="single_export"),
+        pytest.param(3, 2, id="parallel_batches"),
+    ],
+)
+def test_reverse_raivo_to_2fas_round_trip(test_data_directory, exports, workers):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        root = Path(temp_dir)
+        entries = raivo_entries(make_services(30))
+        src_files = []
+        for index in range(exports):
+            src_file = root.joinpath(f"export{index}.zip")
+            RaivoFile(src_file, "test123", entries[index::exports]).save()
+            src_files.append(src_file)
+
+        dst_file = root.joinpath("backup.2fas")
+        reverse_raivo_to_2fas(src_files, dst_file, "test123", workers)
+
+        backup = json.loads(dst_file.read_text())
+        assert backup["services"] == [] and backup["servicesEncrypted"]
+
+        src = read_2fas_file(dst_file, "test123", key_cache=None)
+        expected = [entry for i in range(exports) for entry in entries[i::exports]]
+        assert raivo_entries(src.services) == expected
+        assert [s["order"]["position"] for s in src.services] == list(range(30))
+        assert all(isinstance(s["updatedAt"], int) for s in src.services)
+
+
+def test_reverse_raivo_to_2fas_wrong_password(test_data_directory):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        dst_file = Path(temp_dir).joinpath("backup.2fas")
+        reverse_raivo_to_2fas([], dst_file, "test123")
+        with pytest.raises(ValueError):
+            read_2fas_file(dst_file, "wrong", key_cache=None)
+        assert read_raivo_files([]) == []
+
+
+def test_reverse_raivo_to_2fas_matches_app_backup(test_data_directory):
+    with open(test_data_directory.joinpath("backups", "backup_encrypted.2fas")) as f:
+        app_backup = json.load(f)
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        src_file = Path(temp_dir).joinpath("export.zip")
+        RaivoFile(src_file, "test123", raivo_entries(make_services(3))).save()
+        dst_file = Path(temp_dir).joinpath("backup.2fas")
+        reverse_raivo_to_2fas([src_file], dst_file, "test123")
+        backup = json.loads(dst_file.read_text())
+
+    assert list(backup) == list(app_backup)
+    for key in ("appOrigin", "schemaVersion", "appVersionName", "appVersionCode"):
+        assert backup[key] == app_backup[key]
+    assert backup["reference"] == app_backup["reference"] == ""
+    assert len(backup["servicesEncrypted"].split(":")) == len(
+        app_backup["servicesEncrypted"].split(":")
+    )
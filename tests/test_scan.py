@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from benchmarks.synthetic import make_vault, write_vault
+from src.scan import Scanner, read_backup_info, scan_backups
+
+
+def backup_info(path: Path):
+    st = path.stat()
+    return read_backup_info(str(path), st.st_size, st.st_mtime)
+
+
+@pytest.mark.parametrize(
+    ("file_name", "encrypted", "services"),
+    [
+        pytest.param("backup_encrypted.2fas", True, None, id="encrypted"),
+        pytest.param("backup_unencrypted.2fas", False, 1, id="unencrypted"),
+    ],
+)
+def test_read_backup_info(test_data_directory, file_name, encrypted, services):
+    info = backup_info(test_data_directory.joinpath("backups", file_name))
+    assert info.schema_version == 4
+    assert info.app_origin == "ios"
+    assert info.encrypted == encrypted
+    assert info.services == services
+
+
+def test_read_backup_info_services(test_data_directory):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        vault = make_vault(5)
+        # A service named like a key must not be counted twice
+        vault["services"][0]["name"] = '"secret": x'
+        path = Path(temp_dir).joinpath("vault.2fas")
+        path.write_text(json.dumps(vault, indent=4))
+        assert backup_info(path).services == 5
+
+
+def test_scan_backups(test_data_directory):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        root = Path(temp_dir)
+        nested = root.joinpath("a", "b")
+        nested.mkdir(parents=True)
+        write_vault(root.joinpath("top.2fas"), 2)
+        write_vault(nested.joinpath("deep.2fas"), 3, "test123")
+        root.joinpath("notes.txt").write_text("not a backup")
+
+        backups = scan_backups(root)
+        assert [Path(info.path).name for info in backups] == ["deep.2fas", "top.2fas"]
+        assert [info.encrypted for info in backups] == [True, False]
+        assert [Path(i.path).name for i in scan_backups(root, False)] == ["top.2fas"]
+
+        with pytest.raises(ValueError):
+            scan_backups(root.joinpath("notes.txt"))
+
+
+def test_scanner_cache(test_data_directory):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        root = Path(temp_dir)
+        cache_file = root.joinpath(".scan.json")
+        first = write_vault(root.joinpath("first.2fas"), 2)
+        second = write_vault(root.joinpath("second.2fas"), 2)
+
+        scanner = Scanner(cache_file)
+        scanner.scan(root)
+        scanner.save()
+        assert (scanner.hits, scanner.misses) == (0, 2)
+
+        write_vault(second, 4)
+        st = second.stat()
+        os.utime(second, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        first.unlink()
+
+        scanner = Scanner(cache_file)
+        backups = scanner.scan(root)
+        assert [info.services for info in backups] == [4]
+        assert (scanner.hits, scanner.misses) == (0, 1)
+
+        backups = scanner.scan(root)
+        assert (scanner.hits, scanner.misses) == (1, 1)
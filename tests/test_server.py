@@ -0,0 +1,124 @@
+import asyncio
+import io
+import json
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.raivo import RAIVO_EXPORT_NAME
+from src.server import ConversionServer
+
+
+async def request(port: int, method: str, path: str, body: bytes = b"", headers=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    head = f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+    head += "".join(f"{k}: {v}\r\n" for k, v in (headers or {}).items())
+    writer.write(head.encode() + b"\r\n" + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), payload
+
+
+def run_with_server(server: ConversionServer, scenario):
+    async def main():
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            return await scenario(port)
+
+    with server.executor:
+        return asyncio.run(main())
+
+
+@pytest.mark.parametrize(
+    ("src_file", "password"),
+    [
+        pytest.param("backup_unencrypted.2fas", None, id="convert_unencrypted_backup"),
+        pytest.param("backup_encrypted.2fas", "test123", id="convert_encrypted_backup"),
+    ],
+)
+def test_server_convert(test_data_directory, src_file, password):
+    data = test_data_directory.joinpath("backups", src_file).read_bytes()
+    headers = {"X-Password": password} if password else {}
+    server = ConversionServer(ThreadPoolExecutor(max_workers=2), max_concurrency=2)
+
+    async def scenario(port):
+        results = await asyncio.gather(
+            *[request(port, "POST", "/convert", data, headers) for _ in range(4)]
+        )
+        return results, await request(port, "GET", "/metrics")
+
+    results, (status, metrics) = run_with_server(server, scenario)
+    for status_code, payload in results:
+        assert status_code == 200
+        pwd = password.encode() if password else None
+        with zipfile.ZipFile(io.BytesIO(payload)) as archive:
+            entries = json.loads(archive.read(RAIVO_EXPORT_NAME, pwd=pwd))
+        assert [entry["issuer"] for entry in entries] == ["Test"]
+    metrics = json.loads(metrics)
+    assert status == 200
+    assert metrics["converted"] == 4
+    assert metrics["latency_seconds"]["max"] > 0
+
+
+def test_server_backpressure():
+    release = threading.Event()
+
+    def slow_convert(data, password):
+        release.wait(5)
+        return b"ok"
+
+    server = ConversionServer(
+        ThreadPoolExecutor(max_workers=1),
+        max_concurrency=1,
+        max_queue=0,
+        convert=slow_convert,
+    )
+
+    async def scenario(port):
+        first = asyncio.create_task(request(port, "POST", "/convert", b"{}"))
+        await asyncio.sleep(0.1)
+        rejected = await request(port, "POST", "/convert", b"{}")
+        release.set()
+        return await first, rejected
+
+    (first, _), (rejected, _) = run_with_server(server, scenario)
+    assert (first, rejected) == (200, 503)
+    assert server.metrics.rejected == 1
+
+
+def test_server_utf8_password():
+    passwords = []
+
+    def record_convert(data, password):
+        passwords.append(password)
+        return b"ok"
+
+    server = ConversionServer(ThreadPoolExecutor(max_workers=1), convert=record_convert)
+    status, _ = run_with_server(
+        server,
+        lambda port: request(
+            port, "POST", "/convert", b"{}", {"X-Password": "pässwörd€"}
+        ),
+    )
+    assert status == 200
+    assert passwords == ["pässwörd€"]
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "body", "expected_status"),
+    [
+        pytest.param("POST", "/convert", b"[]", 422, id="invalid_backup"),
+        pytest.param("GET", "/convert", b"", 405, id="wrong_method"),
+        pytest.param("POST", "/other", b"", 404, id="unknown_path"),
+        pytest.param("POST", "/convert", b"x" * 2048, 413, id="body_too_large"),
+    ],
+)
+def test_server_error(method, path, body, expected_status):
+    server = ConversionServer(ThreadPoolExecutor(max_workers=1), max_body_size=1024)
+    status, _ = run_with_server(server, lambda port: request(port, method, path, body))
+    assert status == expected_status
@@ -0,0 +1,57 @@
+import json
+import tempfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from benchmarks.synthetic import write_vault
+from src.manifest import file_digest
+from src.raivo import RAIVO_EXPORT_NAME
+from src.shard import get_shard_manifest_file, shard_2fas_to_raivo, split_services
+
+
+@pytest.mark.parametrize(
+    "count, shards, expected",
+    [
+        pytest.param(10, 3, [4, 3, 3], id="uneven"),
+        pytest.param(9, 3, [3, 3, 3], id="even"),
+        pytest.param(2, 5, [1, 1], id="more_shards_than_services"),
+        pytest.param(0, 3, [0], id="empty"),
+    ],
+)
+def test_split_services(count, shards, expected):
+    services = list(range(count))
+    chunks = split_services(services, shards)
+    assert [len(chunk) for chunk in chunks] == expected
+    assert [s for chunk in chunks for s in chunk] == services
+
+
+def test_split_services_error():
+    with pytest.raises(ValueError):
+        split_services([1], 0)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2], ids=["inline", "parallel"])
+def test_shard_2fas_to_raivo(test_data_directory, max_workers):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        src = write_vault(Path(temp_dir).joinpath("vault.2fas"), 25, "test123")
+        dst = Path(temp_dir).joinpath("raivo_export.zip")
+        manifest = shard_2fas_to_raivo(src, dst, "test123", 3, 0, max_workers)
+
+        assert manifest["services"] == 25
+        assert manifest["compression_level"] == 0
+        assert json.loads(get_shard_manifest_file(dst).read_text()) == manifest
+
+        issuers = []
+        for described in manifest["shards"]:
+            shard_file = Path(temp_dir).joinpath(described["file"])
+            assert file_digest(shard_file) == described["sha256"]
+            with zipfile.ZipFile(shard_file) as archive:
+                entries = json.loads(archive.read(RAIVO_EXPORT_NAME, pwd=b"test123"))
+            assert len(entries) == described["services"]
+            issuers.extend(entry["issuer"] for entry in entries)
+        assert [d["file"] for d in manifest["shards"]] == [
+            f"raivo_export.part{i:03d}-of-003.zip" for i in (1, 2, 3)
+        ]
+        assert issuers == [f"Service {i}" for i in range(25)]
@@ -0,0 +1,45 @@
+import io
+import json
+
+import pytest
+
+from src.stream import iter_array_items
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 65536])
+@pytest.mark.parametrize(
+    ("document", "expected_items", "expected_fields"),
+    [
+        pytest.param(
+            {"schemaVersion": 4, "services": [{"name": "A"}, 12345, "x"], "groups": []},
+            [{"name": "A"}, 12345, "x"],
+            {"schemaVersion": 4, "groups": []},
+            id="services_between_fields",
+        ),
+        pytest.param(
+            {"services": [], "servicesEncrypted": "a:b:c"},
+            [],
+            {"servicesEncrypted": "a:b:c"},
+            id="empty_services",
+        ),
+        pytest.param({}, [], {}, id="empty_object"),
+    ],
+)
+def test_iter_array_items(chunk_size, document, expected_items, expected_fields):
+    fields = {}
+    fp = io.StringIO(json.dumps(document, indent=4))
+    assert list(iter_array_items(fp, "services", fields, chunk_size)) == expected_items
+    assert fields == expected_fields
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        pytest.param('{"services": [1, 2', id="truncated_array"),
+        pytest.param('{"services": [1 2]}', id="missing_separator"),
+        pytest.param("[1, 2]", id="not_an_object"),
+    ],
+)
+def test_iter_array_items_error(document):
+    with pytest.raises(ValueError):
+        list(iter_array_items(io.StringIO(document), "services", chunk_size=4))
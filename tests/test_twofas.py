@@ -0,0 +1,81 @@
+import pytest
+
+from benchmarks.synthetic import make_vault
+
+from src import twofas
+from src.twofas import TwofasEntry, TwofasFile, decode_services
+
+
+@pytest.mark.parametrize("use_orjson", [True, False], ids=["orjson", "json"])
+@pytest.mark.parametrize(
+    ("plain_text", "expected_result"),
+    [
+        pytest.param(
+            b'{"name": "Test", "secret": "ABC"}',
+            {"name": "Test", "secret": "ABC"},
+            id="single_service",
+        ),
+        pytest.param(
+            b'[{"name": "Test"}, {"name": "Other"}]',
+            [{"name": "Test"}, {"name": "Other"}],
+            id="many_services",
+        ),
+        pytest.param(
+            b'[{"name": "A\\\\B \\"q\\" https:\\/\\/x \\u00e8"}]',
+            [{"name": 'A\\B "q" https://x è'}],
+            id="escaped_characters",
+        ),
+    ],
+)
+def test_decode_services(monkeypatch, use_orjson, plain_text, expected_result):
+    if not use_orjson:
+        monkeypatch.setattr("src.twofas.orjson", None)
+    assert decode_services(plain_text) == expected_result
+
+
+def test_decode_services_error():
+    with pytest.raises(ValueError):
+        decode_services(b"{'name': 'Test'}")
+
+
+def test_twofas_file_default_lists_are_not_shared():
+    first, second = TwofasFile(file_path=None), TwofasFile(file_path=None)
+    first.services.append({"name": "Test"})
+    first.groups.append({"name": "Group"})
+    assert second.services == [] and second.groups == []
+
+
+def test_twofas_file_decrypt_wipes_buffers(monkeypatch):
+    buffers = []
+
+    def capture(plain_text):
+        buffers.append(plain_text)
+        return decode_services(bytes(plain_text))
+
+    monkeypatch.setattr(twofas, "decode_services", capture)
+    vault = make_vault(3, "test123")
+    src = TwofasFile(
+        file_path=None,
+        services_encrypted=vault["servicesEncrypted"],
+        password="test123",
+    )
+    assert src.decrypt(None)
+    assert [service["name"] for service in src.services] == [
+        f"Service {i}" for i in range(3)
+    ]
+    assert len(buffers) == 1 and buffers[0] == bytes(len(buffers[0]))
+
+
+def test_twofas_entry_default_updated_at():
+    assert isinstance(TwofasEntry(name="Test", secret="ABC").updated_at, int)
+    assert TwofasEntry(name="Test", secret="ABC", updated_at=1).updated_at == 1
+
+
+def test_twofas_file_encrypt_round_trip():
+    services = make_vault(3)["services"]
+    src = TwofasFile(file_path=None, services=list(services), password="test123")
+    assert src.encrypt()
+    assert src.services == [] and src.encrypted
+    assert not src.encrypt()
+    assert src.decrypt(None)
+    assert src.services == services
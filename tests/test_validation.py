@@ -0,0 +1,131 @@
+import json
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from benchmarks.synthetic import make_services, make_vault, write_vault
+from src.helpers import convert_2fas_to_raivo, stream_2fas_to_raivo
+from src.verify import read_raivo_entries
+from src.validation import (
+    ValidationError,
+    ValidationReport,
+    is_base32,
+    validate_services,
+)
+
+
+@pytest.mark.parametrize(
+    "secret, expected",
+    [
+        pytest.param("JBSWY3DPEHPK3PXP", True, id="valid"),
+        pytest.param("jbsw y3dp-ehpk 3pxp", True, id="formatted"),
+        pytest.param("JBSWY3DPEHPK3PXP====", True, id="padded"),
+        pytest.param("ABCDEFGHIJKLMNOPQRSTUZXYW0123456", False, id="invalid_chars"),
+        pytest.param("JBSWY3D", True, id="partial_block"),
+        pytest.param("JBS", False, id="bad_length"),
+        pytest.param("", False, id="empty"),
+    ],
+)
+def test_is_base32(secret, expected):
+    assert is_base32(secret) == expected
+
+
+@pytest.mark.parametrize(
+    "otp, secret, fields",
+    [
+        pytest.param({}, "JBSWY3DPEHPK3PXP", [], id="valid"),
+        pytest.param({}, "JBSWY3DPEHPK3PX1", ["secret"], id="bad_secret"),
+        pytest.param({}, None, ["secret"], id="missing_secret"),
+        pytest.param({"algorithm": "MD5"}, "JBSWY3DP", ["algorithm"], id="algorithm"),
+        pytest.param({"tokenType": "STEAM"}, "JBSWY3DP", ["tokenType"], id="kind"),
+        pytest.param({"digits": 5}, "JBSWY3DP", ["digits"], id="digits"),
+        pytest.param({"period": None}, "JBSWY3DP", ["period"], id="missing_period"),
+        pytest.param({"period": 0}, "JBSWY3DP", ["period"], id="zero_period"),
+        pytest.param({"counter": None}, "JBSWY3DP", ["counter"], id="counter"),
+        pytest.param({"counter": -5}, "JBSWY3DP", ["counter"], id="negative_counter"),
+        pytest.param({"counter": "²"}, "JBSWY3DP", ["counter"], id="superscript"),
+        pytest.param({"digits": "-6"}, "JBSWY3DP", ["digits"], id="signed_digits"),
+        pytest.param(
+            {"digits": "8", "period": "60", "counter": "1"},
+            "JBSWY3DP",
+            [],
+            id="numeric_strings",
+        ),
+    ],
+)
+def test_validate_services(otp, secret, fields):
+    service = make_services(1)[0]
+    service["secret"] = secret
+    service["otp"].update(otp)
+    report = validate_services([service])
+    assert report.checked == 1
+    assert [issue.field for issue in report.issues] == fields
+    assert report.ok == (fields == [])
+
+
+def test_validate_services_report():
+    services = make_services(3)
+    services[1]["otp"] = None
+    services[2]["otp"]["digits"] = 12
+    report = validate_services(services[:2])
+    validate_services(services[2:], report)
+    assert report.checked == 3
+    assert report.invalid_services == 2
+    assert report.asdict()["issues"] == [
+        {"index": 1, "name": "Service 1", "field": "otp", "message": "is missing"},
+        {
+            "index": 2,
+            "name": "Service 2",
+            "field": "digits",
+            "message": "12 is not 6, 7 or 8",
+        },
+    ]
+
+
+@pytest.mark.parametrize("stream", [False, True], ids=["convert", "stream"])
+def test_strict_conversion(test_data_directory, stream):
+    src = test_data_directory.joinpath("backups", "backup_unencrypted.2fas")
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        dst = Path(temp_dir).joinpath("raivo_export.zip")
+        convert = stream_2fas_to_raivo if stream else convert_2fas_to_raivo
+
+        report = ValidationReport()
+        convert(src, dst, report=report)
+        assert dst.exists()
+        assert [issue.field for issue in report.issues] == ["secret"]
+
+        dst.unlink()
+        with pytest.raises(ValidationError) as exc_info:
+            convert(src, dst, strict=True)
+        assert not dst.exists()
+        assert exc_info.value.report.invalid_services == 1
+
+
+def test_strict_conversion_valid(test_data_directory):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        src = write_vault(Path(temp_dir).joinpath("vault.2fas"), 10, None)
+        dst = Path(temp_dir).joinpath("raivo_export.zip")
+        convert_2fas_to_raivo(src, dst, strict=True)
+        assert dst.exists()
+
+
+@pytest.mark.parametrize("stream", [False, True], ids=["convert", "stream"])
+@pytest.mark.parametrize("otp", [None, "missing"], ids=["null", "missing"])
+def test_conversion_skips_services_without_otp(test_data_directory, stream, otp):
+    vault = make_vault(3)
+    if otp is None:
+        vault["services"][1]["otp"] = None
+    else:
+        del vault["services"][1]["otp"]
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        src = Path(temp_dir).joinpath("vault.2fas")
+        src.write_text(json.dumps(vault))
+        dst = Path(temp_dir).joinpath("raivo_export.zip")
+        convert = stream_2fas_to_raivo if stream else convert_2fas_to_raivo
+
+        report = ValidationReport()
+        convert(src, dst, report=report)
+        assert [(i.index, i.field) for i in report.issues] == [(1, "otp")]
+        entries = read_raivo_entries(dst)
+        assert [entry["issuer"] for entry in entries] == ["Service 0", "Service 2"]
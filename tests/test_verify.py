@@ -0,0 +1,134 @@
+import base64
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+import src.main
+from benchmarks.synthetic import make_services, write_vault
+from src.helpers import convert_2fas_to_raivo, read_2fas_file
+from src.raivo import RaivoEntry
+from src.verify import (
+    OTPGenerator,
+    VerificationMismatch,
+    VerificationReport,
+    decode_secret,
+    verify_raivo_file,
+    verify_services,
+)
+
+RFC_SEEDS = {
+    "SHA1": b"12345678901234567890",
+    "SHA256": b"12345678901234567890123456789012",
+    "SHA512": b"1234567890123456789012345678901234567890123456789012345678901234",
+}
+
+
+@pytest.mark.parametrize(
+    "algorithm, timestamp, expected",
+    [
+        pytest.param("SHA1", 59, "94287082", id="sha1_59"),
+        pytest.param("SHA256", 59, "46119246", id="sha256_59"),
+        pytest.param("SHA512", 59, "90693936", id="sha512_59"),
+        pytest.param("SHA1", 1111111109, "07081804", id="sha1_1111111109"),
+        pytest.param("SHA256", 2000000000, "90698825", id="sha256_2000000000"),
+        pytest.param("SHA512", 20000000000, "47863826", id="sha512_20000000000"),
+    ],
+)
+def test_totp_rfc6238(algorithm, timestamp, expected):
+    secret = base64.b32encode(RFC_SEEDS[algorithm]).decode()
+    generator = OTPGenerator.build(secret, algorithm, 8, 30, 0, "TOTP")
+    assert generator.codes([timestamp]) == [expected]
+
+
+@pytest.mark.parametrize(
+    "counter, expected",
+    [
+        pytest.param(0, "755224", id="counter_0"),
+        pytest.param(9, "520489", id="counter_9"),
+    ],
+)
+def test_hotp_rfc4226(counter, expected):
+    secret = base64.b32encode(RFC_SEEDS["SHA1"]).decode()
+    generator = OTPGenerator.build(secret, "SHA1", 6, 30, counter, "HOTP")
+    assert generator.codes([0, 30, 60]) == [expected]
+
+
+def test_decode_secret():
+    assert decode_secret("gezd gnbv-gy3t qojq") == b"1234567890"
+    assert decode_secret("NOT-BASE32-0189") is None
+    assert decode_secret(None) is None
+
+
+def test_verify_services():
+    services = make_services(50)
+    entries = [e.asdict() for e in RaivoEntry.from_twofas_services(services)]
+    timestamps = [1700000000 + 30 * i for i in range(5)]
+
+    report = verify_services(services, entries, timestamps)
+    assert report.ok
+    assert report.checked == 50
+    assert report.unverifiable == 0
+
+    entries[3]["digits"] = "7"
+    entries[7]["secret"] = "JBSWY3DPEHPK3PXP"
+    entries[9]["algorithm"] = "MD5"
+    report = verify_services(services, entries[:-1], timestamps)
+    assert [(m.index, m.reason) for m in report.mismatches] == [
+        (-1, "50 services but 49 Raivo entries"),
+        (3, "codes differ"),
+        (7, "codes differ"),
+        (9, "only one side produces codes"),
+    ]
+
+
+@pytest.mark.parametrize("password", ["test123", None], ids=["encrypted", "plain"])
+def test_verify_raivo_file(test_data_directory, password):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        src = write_vault(Path(temp_dir).joinpath("vault.2fas"), 30, password)
+        dst = Path(temp_dir).joinpath("raivo_export.zip")
+        convert_2fas_to_raivo(src, dst, password)
+        services = read_2fas_file(src, password).services
+        report = verify_raivo_file(services, dst, password, [0, 1700000000])
+        assert report.ok
+        assert report.checked == 30
+
+
+def test_totp_codes_match_at():
+    services = make_services(1)
+    generator = OTPGenerator.from_twofas_service(services[0])
+    timestamps = [0, 29, 30, 1700000000]
+    assert generator.codes(timestamps) == [
+        generator.at(timestamp // generator.period) for timestamp in timestamps
+    ]
+
+
+@pytest.mark.parametrize(
+    "mismatches, exit_code",
+    [
+        pytest.param([], None, id="passed"),
+        pytest.param([VerificationMismatch(0, "a", "codes differ")], 1, id="failed"),
+    ],
+)
+def test_verify_exit_status(test_data_directory, monkeypatch, mismatches, exit_code):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        src_file = write_vault(Path(temp_dir).joinpath("vault.2fas"), 3)
+        dst_file = Path(temp_dir).joinpath("raivo_export.zip")
+        monkeypatch.chdir(temp_dir)
+        monkeypatch.setattr(
+            src.main,
+            "verify_raivo_file",
+            lambda *args: VerificationReport(checked=3, mismatches=mismatches),
+        )
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["twofas2raivo", "-s", str(src_file), "-d", str(dst_file), "--verify"],
+        )
+        if exit_code is None:
+            src.main.main()
+        else:
+            with pytest.raises(SystemExit) as exc_info:
+                src.main.main()
+            assert exc_info.value.code == exit_code
@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from src.watcher import Watcher
+
+
+def test_watcher_poll_debounce(test_data_directory):
+    now = [0.0]
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        src_dir = Path(temp_dir)
+        watcher = Watcher(src_dir, src_dir, settle_time=2, clock=lambda: now[0])
+        backup = src_dir.joinpath("backup.2fas")
+        backup.write_text("{")
+        assert watcher.poll() == []
+
+        now[0] = 1.0
+        backup.write_text("{}")
+        os.utime(backup, ns=(1, 1))
+        assert watcher.poll() == []
+
+        now[0] = 2.5
+        assert watcher.poll() == []
+        now[0] = 3.5
+        assert watcher.poll() == [backup]
+
+        watcher._converted[backup] = watcher._seen[backup][0]
+        now[0] = 10.0
+        assert watcher.poll() == []
+
+        backup.unlink()
+        assert watcher.poll() == []
+        assert watcher._seen == {}
+
+
+def test_watcher_run(test_data_directory):
+    results = []
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        src_dir = Path(temp_dir).joinpath("spool")
+        dst_dir = Path(temp_dir).joinpath("exports")
+        src_dir.mkdir()
+        shutil.copy(
+            test_data_directory.joinpath("backups", "backup_unencrypted.2fas"), src_dir
+        )
+
+        def on_result(result):
+            results.append(result)
+            watcher.stop()
+
+        watcher = Watcher(
+            src_dir,
+            dst_dir,
+            max_workers=1,
+            interval=0.05,
+            settle_time=0,
+            on_result=on_result,
+        )
+        watcher.run()
+        assert [r.success for r in results] == [True]
+        assert dst_dir.joinpath("backup_unencrypted.zip").exists()
+
+
+@pytest.mark.parametrize(
+    ("strict", "success"),
+    [
+        pytest.param(False, True, id="lenient"),
+        pytest.param(True, False, id="strict"),
+    ],
+)
+def test_watcher_passes_options(test_data_directory, strict, success):
+    results = []
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        src_dir = Path(temp_dir).joinpath("spool")
+        dst_dir = Path(temp_dir).joinpath("exports")
+        src_dir.mkdir()
+        shutil.copy(
+            test_data_directory.joinpath("backups", "backup_unencrypted.2fas"), src_dir
+        )
+
+        def on_result(result):
+            results.append(result)
+            watcher.stop()
+
+        watcher = Watcher(
+            src_dir,
+            dst_dir,
+            max_workers=1,
+            compression_level=0,
+            strict=strict,
+            interval=0.05,
+            settle_time=0,
+            on_result=on_result,
+        )
+        watcher.run()
+        assert [r.success for r in results] == [success]
+        if not success:
+            assert "Validation failed" in results[0].error
+            return
+        with zipfile.ZipFile(dst_dir.joinpath("backup_unencrypted.zip")) as archive:
+            assert all(
+                info.compress_type == zipfile.ZIP_STORED for info in archive.infolist()
+            )
+
+
+@pytest.mark.parametrize(
+    ("kwargs", "error_type"),
+    [
+        pytest.param({"src_dir": "spool"}, TypeError, id="src_dir_is_not_path_object"),
+        pytest.param({"interval": 0}, ValueError, id="invalid_interval"),
+    ],
+)
+def test_watcher_error(kwargs, error_type):
+    with pytest.raises(error_type):
+        Watcher(**{"src_dir": Path("."), "dst_dir": Path("."), **kwargs})
@@ -0,0 +1,183 @@
+import csv
+import io
+import json
+import os
+import stat
+import tempfile
+import zipfile
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from benchmarks.synthetic import make_services, write_vault
+from src.helpers import convert_2fas_to_raivo, stream_2fas_to_raivo
+from src.raivo import RAIVO_EXPORT_NAME, RaivoEntry, RaivoFile
+from src.writers import (
+    WRITERS,
+    OutputWriter,
+    get_writer,
+    otpauth_uri,
+    save_entries,
+)
+
+
+def raivo_entries(count: int) -> list:
+    services = make_services(count)
+    return [entry.asdict() for entry in RaivoEntry.from_twofas_services(services)]
+
+
+def read_output(data: bytes, output_format: str) -> list:
+    if output_format == "raivo":
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            return json.loads(archive.read(RAIVO_EXPORT_NAME, pwd=b"test123"))
+    if output_format == "json":
+        return json.loads(data)
+    if output_format == "csv":
+        return list(csv.DictReader(io.StringIO(data.decode("utf-8"), newline="")))
+    return data.decode("utf-8").splitlines()
+
+
+@pytest.mark.parametrize("output_format", list(WRITERS))
+@pytest.mark.parametrize("count", [0, 1, 20], ids=["empty", "single", "many"])
+def test_writers(output_format, count):
+    entries = raivo_entries(count)
+    fileobj = io.BytesIO()
+    with get_writer(output_format)(fileobj, "test123") as writer:
+        for entry in entries:
+            writer.write(entry)
+    assert writer.count == count
+    assert not fileobj.closed
+
+    result = read_output(fileobj.getvalue(), output_format)
+    if output_format == "otpauth":
+        assert result == [otpauth_uri(entry) for entry in entries]
+    else:
+        assert result == entries
+
+
+def test_raivo_writer_matches_raivo_file():
+    entries = raivo_entries(5)
+    fileobj = io.BytesIO()
+    with get_writer("raivo")(fileobj, "test123") as writer:
+        for entry in entries:
+            writer.write(entry)
+    expected = RaivoFile(None, "test123", entries).to_bytes()
+    assert read_output(fileobj.getvalue(), "raivo") == read_output(expected, "raivo")
+
+
+@pytest.mark.parametrize(
+    ("entry", "expected"),
+    [
+        pytest.param(
+            {
+                "issuer": "ACME Co",
+                "account": "john@example.com",
+                "secret": "JBSWY3DPEHPK3PXP",
+                "algorithm": "SHA1",
+                "digits": "6",
+                "timer": "30",
+                "counter": "0",
+                "kind": "TOTP",
+            },
+            "otpauth://totp/ACME%20Co:john@example.com?secret=JBSWY3DPEHPK3PXP"
+            "&issuer=ACME%20Co&algorithm=SHA1&digits=6&period=30",
+            id="totp",
+        ),
+        pytest.param(
+            {
+                "issuer": "",
+                "account": "a:b",
+                "secret": "JBSWY3DPEHPK3PXP",
+                "algorithm": "SHA256",
+                "digits": "8",
+                "timer": "30",
+                "counter": "7",
+                "kind": "HOTP",
+            },
+            "otpauth://hotp/a%3Ab?secret=JBSWY3DPEHPK3PXP"
+            "&issuer=&algorithm=SHA256&digits=8&counter=7",
+            id="hotp_without_issuer",
+        ),
+    ],
+)
+def test_otpauth_uri(entry, expected):
+    uri = otpauth_uri(entry)
+    assert uri == expected
+    assert parse_qs(urlparse(uri).query)["secret"] == [entry["secret"]]
+
+
+def test_output_writer_is_abstract():
+    with pytest.raises(TypeError):
+        OutputWriter(io.BytesIO())
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX file modes")
+@pytest.mark.parametrize("stream", [False, True], ids=["convert", "stream"])
+@pytest.mark.parametrize("output_format", ["json", "csv", "otpauth"])
+def test_unencrypted_output_is_private(test_data_directory, stream, output_format):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        src = write_vault(Path(temp_dir).joinpath("vault.2fas"), 3)
+        dst = (
+            Path(temp_dir)
+            .joinpath("export")
+            .with_suffix(get_writer(output_format).suffix)
+        )
+        dst.write_bytes(b"")
+        dst.chmod(0o644)
+        if stream:
+            stream_2fas_to_raivo(src, dst, output_format=output_format)
+        else:
+            convert_2fas_to_raivo(src, dst, output_format=output_format)
+        assert stat.S_IMODE(dst.stat().st_mode) == 0o600
+
+
+@pytest.mark.parametrize("compression_level", [0, 5], ids=["stored", "deflated"])
+def test_save_entries_raivo(test_data_directory, zip_backend, compression_level):
+    entries = raivo_entries(20)
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        dst = Path(temp_dir).joinpath("export.zip")
+        assert save_entries(entries, dst, "raivo", "test123", compression_level) == 20
+        assert read_output(dst.read_bytes(), "raivo") == entries
+
+        def broken():
+            yield entries[0]
+            raise RuntimeError("Broken source")
+
+        with pytest.raises(RuntimeError):
+            save_entries(broken(), dst, "raivo", "test123", compression_level)
+        assert not dst.exists()
+
+
+def test_get_writer_error():
+    with pytest.raises(ValueError):
+        get_writer("xml")
+
+
+def test_save_entries_removes_partial_output(test_data_directory):
+    def entries():
+        yield raivo_entries(1)[0]
+        raise RuntimeError("Broken source")
+
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        dst = Path(temp_dir).joinpath("export.csv")
+        with pytest.raises(RuntimeError):
+            save_entries(entries(), dst, "csv")
+        assert not dst.exists()
+
+
+@pytest.mark.parametrize("stream", [False, True], ids=["convert", "stream"])
+@pytest.mark.parametrize("output_format", ["json", "csv", "otpauth"])
+def test_convert_2fas_to_raivo_formats(test_data_directory, stream, output_format):
+    with tempfile.TemporaryDirectory(dir=test_data_directory) as temp_dir:
+        src = write_vault(Path(temp_dir).joinpath("vault.2fas"), 10)
+        dst = Path(temp_dir).joinpath("export.zip")
+        if stream:
+            stream_2fas_to_raivo(src, dst, output_format=output_format)
+        else:
+            convert_2fas_to_raivo(src, dst, output_format=output_format)
+
+        suffix = get_writer(output_format).suffix
+        assert not dst.exists()
+        result = read_output(dst.with_suffix(suffix).read_bytes(), output_format)
+        assert len(result) == 10